@@ -0,0 +1,58 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+from search import SEARCH_EXCLUSION
+
+MAX_BATCH_GET_IDS = 1000
+
+
+# Every requested id gets a result in request order, found documents come from one $in query.
+# Without extra stages the read-through cache is consulted first and filled with what was loaded.
+# When the cache saw a recent write to one of the missing ids, they are read from primary instead.
+async def batch_get(collection, ids: list, label: str, cache=None, stages=None, primary=None) -> dict:
+    if len(ids) > MAX_BATCH_GET_IDS:
+        raise HTTPException(status_code=413, detail=f"Too many ids, the limit is {MAX_BATCH_GET_IDS}")
+
+    parsed = {}
+    for raw_id in ids:
+        try:
+            parsed[raw_id] = ObjectId(raw_id)
+        except (InvalidId, TypeError):
+            continue
+
+    found, wanted = {}, set()
+    for obj_id in parsed.values():
+        doc = cache.get(obj_id) if cache is not None and cache.enabled and not stages else None
+        if doc is None:
+            wanted.add(obj_id)
+        else:
+            found[obj_id] = doc
+
+    if wanted:
+        if primary is not None and cache is not None and any(cache.written_recently(obj_id) for obj_id in wanted):
+            collection = primary
+        generation = cache.generation() if cache is not None else None
+        query = {"_id": {"$in": list(wanted)}}
+        if stages:
+            pipeline = [{"$match": query}, {"$project": SEARCH_EXCLUSION}, *stages]
+            docs = await (await collection.aggregate(pipeline)).to_list(None)
+        else:
+            docs = await collection.find(query, SEARCH_EXCLUSION).to_list(None)
+        for doc in docs:
+            found[doc["_id"]] = doc
+            if cache is not None and not stages:
+                cache.set(doc["_id"], doc, generation)
+
+    results = []
+    for index, raw_id in enumerate(ids):
+        obj_id = parsed.get(raw_id)
+        if obj_id is None:
+            results.append({"index": index, "id": raw_id, "status": "error", "error": "Invalid ID format"})
+        elif obj_id not in found:
+            results.append({"index": index, "id": raw_id, "status": "error", "error": f"{label} not found"})
+        else:
+            results.append({"index": index, "id": raw_id, "status": "found", "data": found[obj_id]})
+
+    found_count = sum(1 for result in results if result["status"] == "found")
+    return {"found": found_count, "failed": len(results) - found_count, "results": results}
@@ -0,0 +1,657 @@
+# Load test for the API: seeds synthetic items and monsters through the bulk endpoints, then drives every route
+# with concurrent clients and writes latency percentiles and throughput as JSON, so runs can be compared.
+#
+#   python benchmark.py seed --scale 100k
+#   python benchmark.py run --concurrency 32 --duration 10 --label 100k --output baseline.json
+#   python benchmark.py compare baseline.json current.json
+#
+# Seeding goes through the server, so it works with whatever database the server is pointed at.
+# Start the server with MONGODB_DATABASE=dnd_benchmark to keep the synthetic data out of the real one.
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+import httpx
+
+from models import ItemModel, MonsterModel
+
+DEFAULT_URL = os.getenv("BENCHMARK_URL", "http://127.0.0.1:8000")
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000, "1m": 1000000}
+SEED_CHUNK_SIZE = 10000
+SEED_PARALLEL = 4
+SAMPLE_SIZE = 50000
+SAMPLE_PAGE_SIZE = 500
+BATCH_GET_SIZE = 50
+BULK_WRITE_SIZE = 100
+REQUEST_TIMEOUT = 300
+NDJSON_HEADERS = {"Content-Type": "application/x-ndjson"}
+BSON_HEADERS = {"Accept": "application/bson"}
+
+ADJECTIVES = (
+    "Ancient", "Blazing", "Cursed", "Dwarven", "Elven", "Frozen", "Gilded", "Hollow",
+    "Iron", "Jade", "Mithral", "Obsidian", "Radiant", "Shadow", "Storm", "Venomous"
+)
+ITEM_NOUNS = ("Sword", "Shield", "Potion", "Wand", "Ring", "Amulet", "Bow", "Cloak", "Dagger", "Helm", "Staff", "Tome")
+MONSTER_NOUNS = (
+    "Goblin", "Mage", "Cultist", "Acolyte", "Wyrm", "Troll", "Wraith", "Golem", "Harpy", "Ogre", "Lich", "Kobold"
+)
+DESC_WORDS = (
+    "arcane", "blade", "crystal", "dark", "ember", "forge", "glyph", "hunter",
+    "keeper", "lore", "moon", "rune", "spirit", "thunder", "ward", "whisper"
+)
+RARITIES = ("Common", "Uncommon", "Rare", "Very Rare", "Legendary")
+COINS = ("cp", "sp", "gp", "pp")
+CHALLENGES = ("0", "1/8", "1/4", "1/2", *(str(cr) for cr in range(1, 31)))
+SPEEDS = ("20 ft", "25 ft", "30 ft", "40 ft", "60 ft")
+
+
+def parse_scale(scale: str) -> int:
+    if scale.lower() in SCALES:
+        return SCALES[scale.lower()]
+    try:
+        return int(scale)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Unknown scale {scale}, use a number or one of {', '.join(SCALES)}")
+
+
+# Every document is generated from its own index, so a scale always produces the same data and
+# seeding a bigger scale on top of a smaller one only adds the missing documents
+def doc_random(seed: int, kind: str, index: int) -> random.Random:
+    return random.Random(f"{seed}:{kind}:{index}")
+
+
+def description(rng: random.Random) -> str:
+    return " ".join(rng.choice(DESC_WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+
+
+def make_item(seed: int, index: int) -> dict:
+    rng = doc_random(seed, "item", index)
+    item = {
+        "name": f"{rng.choice(ADJECTIVES)} {rng.choice(ITEM_NOUNS)} {index}",
+        "weight": round(rng.uniform(0.1, 50), 1),
+        "value": f"{rng.randint(1, 5000):,} {rng.choice(COINS)}",
+        "rarity": rng.choice(RARITIES),
+        "desc": description(rng),
+    }
+    return ItemModel.model_validate(item).model_dump(exclude={"id", "value_cp", "version"})
+
+
+def make_monster(seed: int, index: int, item_ids: list) -> dict:
+    rng = doc_random(seed, "monster", index)
+    monster = {
+        "name": f"{rng.choice(ADJECTIVES)} {rng.choice(MONSTER_NOUNS)} {index}",
+        "ac": rng.randint(8, 22),
+        "hp": rng.randint(1, 500),
+        "speed": rng.choice(SPEEDS),
+        "challenge": rng.choice(CHALLENGES),
+        **{stat: rng.randint(3, 30) for stat in (
+            "strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma"
+        )},
+        "held_item_id": rng.choice(item_ids) if item_ids and rng.random() < 0.7 else None,
+        "desc": description(rng),
+    }
+    return MonsterModel.model_validate(monster).model_dump(exclude={"id", "challenge_num", "version"})
+
+
+async def post_ndjson(client: httpx.AsyncClient, path: str, docs: list) -> dict:
+    body = "\n".join(json.dumps(doc) for doc in docs)
+    response = await client.post(path, content=body, headers=NDJSON_HEADERS)
+    response.raise_for_status()
+    return response.json()
+
+
+async def seed_collection(client: httpx.AsyncClient, path: str, count: int, make_doc) -> list:
+    semaphore = asyncio.Semaphore(SEED_PARALLEL)
+    ids, totals = [], {"inserted": 0, "failed": 0}
+
+    async def send(start: int):
+        async with semaphore:
+            docs = [make_doc(index) for index in range(start, min(start + SEED_CHUNK_SIZE, count))]
+            report = await post_ndjson(client, path, docs)
+        totals["inserted"] += report["inserted"]
+        totals["failed"] += report["failed"]
+        ids.extend(result["id"] for result in report["results"] if result["status"] == "inserted")
+
+    await asyncio.gather(*(send(start) for start in range(0, count, SEED_CHUNK_SIZE)))
+    # Documents left over from an earlier seed fail as duplicates, which is expected
+    print(f"{path}: {totals['inserted']} inserted, {totals['failed']} already present or rejected")
+    return ids
+
+
+# Reservoir sample over the whole collection. Taking the first page instead gave ids that all fit in the
+# document cache, so the id routes measured the cache rather than the database.
+async def sample_ids(client: httpx.AsyncClient, collection: str, size: int = SAMPLE_SIZE, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    sample, seen, cursor = [], 0, None
+    while True:
+        params = {"limit": SAMPLE_PAGE_SIZE, "fields": "name"}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get(f"/{collection}", params=params)
+        response.raise_for_status()
+        page = response.json()
+        for doc in page["data"]:
+            seen += 1
+            if len(sample) < size:
+                sample.append((doc["_id"], doc["name"]))
+            else:
+                slot = rng.randrange(seen)
+                if slot < size:
+                    sample[slot] = (doc["_id"], doc["name"])
+        cursor = page["next"]
+        if not cursor:
+            return sample
+
+
+async def doc_cache_size(client: httpx.AsyncClient):
+    response = await client.get("/status/cache")
+    if response.status_code != 200:
+        return None
+    return response.json()["items"]["max_size"]
+
+
+async def seed(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=REQUEST_TIMEOUT) as client:
+        started = time.perf_counter()
+        item_ids = await seed_collection(client, "/items/bulk", args.scale, lambda index: make_item(args.seed, index))
+        if not item_ids:
+            item_ids = [doc_id for doc_id, _ in await sample_ids(client, "items")]
+        await seed_collection(
+            client, "/monsters/bulk", args.scale, lambda index: make_monster(args.seed, index, item_ids)
+        )
+        print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.bytes = 0
+
+    def record(self, status, latency: float = None, size: int = 0):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if latency is not None:
+            self.latencies.append(latency)
+        if status == "exception" or status >= 400:
+            self.errors += 1
+        self.bytes += size
+
+    def summary(self, elapsed: float) -> dict:
+        latencies = sorted(self.latencies)
+        requests = sum(self.statuses.values())
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items(), key=str)},
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+            "bytes_per_request": round(self.bytes / requests) if requests else None,
+            "latency_ms": {
+                "mean": to_ms(sum(latencies) / len(latencies)) if latencies else None,
+                "p50": to_ms(percentile(latencies, 0.50)),
+                "p95": to_ms(percentile(latencies, 0.95)),
+                "p99": to_ms(percentile(latencies, 0.99)),
+                "max": to_ms(latencies[-1]) if latencies else None,
+            },
+        }
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(values: list, fraction: float):
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+def to_ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+# Shared by the workers of a run. Scenarios do their setup with the client directly
+# and time exactly one request through timed().
+class Context:
+    def __init__(self, client: httpx.AsyncClient, items: list, monsters: list, seed: int):
+        self.client = client
+        self.items = items
+        self.monsters = monsters
+        self.rng = random.Random(seed)
+        self.recorder = Recorder()
+        # Write scenarios only touch documents they created, so the seeded data stays comparable between runs
+        self.scratch = {"items": [], "monsters": []}
+
+    async def timed(self, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record("exception")
+            return None
+        self.recorder.record(response.status_code, time.perf_counter() - started, len(response.content))
+        return response
+
+    def item_id(self) -> str:
+        return self.rng.choice(self.items)[0]
+
+    def monster_id(self) -> str:
+        return self.rng.choice(self.monsters)[0]
+
+    def search_word(self, collection: str) -> str:
+        _, name = self.rng.choice(self.items if collection == "items" else self.monsters)
+        return self.rng.choice([*name.split()[:2], self.rng.choice(DESC_WORDS)]).lower()
+
+    # Swaps two neighbouring letters, so fuzzy search has a typo to correct
+    def typo(self, word: str) -> str:
+        if len(word) < 4:
+            return word
+        position = self.rng.randrange(1, len(word) - 2)
+        return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+    def new_doc(self, collection: str) -> dict:
+        seed = self.rng.randrange(10 ** 9)
+        doc = make_item(seed, 0) if collection == "items" else make_monster(seed, 0, [self.item_id()])
+        doc["name"] = f"Benchmark {uuid.uuid4().hex}"
+        return doc
+
+    async def create_scratch(self, collection: str, count: int) -> list:
+        docs = [self.new_doc(collection) for _ in range(count)]
+        report = await post_ndjson(self.client, f"/{collection}/bulk", docs)
+        ids = [result["id"] for result in report["results"] if result["status"] == "inserted"]
+        self.scratch[collection].extend(ids)
+        return ids
+
+    async def scratch_ids(self, collection: str, count: int = 1) -> list:
+        missing = count - len(self.scratch[collection])
+        if missing > 0:
+            await self.create_scratch(collection, missing)
+        return self.rng.sample(self.scratch[collection], count)
+
+    # Ids handed out here are removed from the pool, for the scenarios that delete them
+    async def take_scratch(self, collection: str, count: int = 1) -> list:
+        ids = await self.create_scratch(collection, count)
+        for doc_id in ids:
+            self.scratch[collection].remove(doc_id)
+        return ids
+
+    async def cleanup(self):
+        for collection, ids in self.scratch.items():
+            for start in range(0, len(ids), SEED_CHUNK_SIZE):
+                chunk = ids[start:start + SEED_CHUNK_SIZE]
+                await self.client.request("DELETE", f"/{collection}/bulk", json={"ids": chunk})
+            ids.clear()
+
+
+SCENARIOS = {}
+
+
+def scenario(name: str, writes: bool = False, heavy: bool = False):
+    def register(run):
+        SCENARIOS[name] = (run, writes, heavy)
+        return run
+    return register
+
+
+@scenario("status")
+async def status(ctx):
+    await ctx.timed("GET", "/status")
+
+
+@scenario("status_cache")
+async def status_cache(ctx):
+    await ctx.timed("GET", "/status/cache")
+
+
+@scenario("metrics")
+async def metrics(ctx):
+    await ctx.timed("GET", "/metrics")
+
+
+@scenario("changes")
+async def changes(ctx):
+    await ctx.timed("GET", "/changes", params={"collection": ctx.rng.choice(("items", "monsters")), "limit": 100})
+
+
+@scenario("items_list")
+async def items_list(ctx):
+    await ctx.timed("GET", "/items", params={"limit": 100})
+
+
+@scenario("items_list_max")
+async def items_list_max(ctx):
+    await ctx.timed("GET", "/items", params={"limit": 500})
+
+
+@scenario("items_list_bson")
+async def items_list_bson(ctx):
+    await ctx.timed("GET", "/items", params={"limit": 500}, headers=BSON_HEADERS)
+
+
+@scenario("items_list_filtered")
+async def items_list_filtered(ctx):
+    params = {"rarity": ctx.rng.choice(RARITIES), "sort": "-value_cp", "limit": 100}
+    await ctx.timed("GET", "/items", params=params)
+
+
+@scenario("items_list_fields")
+async def items_list_fields(ctx):
+    await ctx.timed("GET", "/items", params={"limit": 500, "fields": "name"})
+
+
+@scenario("item_get")
+async def item_get(ctx):
+    await ctx.timed("GET", f"/items/{ctx.item_id()}")
+
+
+@scenario("items_batch_get")
+async def items_batch_get(ctx):
+    await ctx.timed("POST", "/items/batch-get", json={"ids": [ctx.item_id() for _ in range(BATCH_GET_SIZE)]})
+
+
+@scenario("items_search_text")
+async def items_search_text(ctx):
+    await ctx.timed("GET", "/search/items", params={"query": ctx.search_word("items"), "limit": 50})
+
+
+@scenario("items_search_fuzzy")
+async def items_search_fuzzy(ctx):
+    params = {"query": ctx.typo(ctx.search_word("items")), "limit": 50, "mode": "fuzzy"}
+    await ctx.timed("GET", "/search/items", params=params)
+
+
+@scenario("items_export", heavy=True)
+async def items_export(ctx):
+    await ctx.timed("GET", "/export/items")
+
+
+@scenario("items_export_bson", heavy=True)
+async def items_export_bson(ctx):
+    await ctx.timed("GET", "/export/items", headers=BSON_HEADERS)
+
+
+@scenario("monsters_list")
+async def monsters_list(ctx):
+    await ctx.timed("GET", "/monsters", params={"limit": 100})
+
+
+@scenario("monsters_list_max")
+async def monsters_list_max(ctx):
+    await ctx.timed("GET", "/monsters", params={"limit": 500})
+
+
+@scenario("monsters_list_bson")
+async def monsters_list_bson(ctx):
+    await ctx.timed("GET", "/monsters", params={"limit": 500}, headers=BSON_HEADERS)
+
+
+@scenario("monsters_list_expand")
+async def monsters_list_expand(ctx):
+    await ctx.timed("GET", "/monsters", params={"limit": 100, "expand": "held_item"})
+
+
+@scenario("monsters_list_filtered")
+async def monsters_list_filtered(ctx):
+    params = {"challenge_num_min": ctx.rng.randint(0, 20), "sort": "-challenge_num", "limit": 100}
+    await ctx.timed("GET", "/monsters", params=params)
+
+
+@scenario("monster_get")
+async def monster_get(ctx):
+    await ctx.timed("GET", f"/monsters/{ctx.monster_id()}")
+
+
+@scenario("monster_get_expand")
+async def monster_get_expand(ctx):
+    await ctx.timed("GET", f"/monsters/{ctx.monster_id()}", params={"expand": "held_item"})
+
+
+@scenario("monsters_batch_get")
+async def monsters_batch_get(ctx):
+    ids = [ctx.monster_id() for _ in range(BATCH_GET_SIZE)]
+    await ctx.timed("POST", "/monsters/batch-get", params={"expand": "held_item"}, json={"ids": ids})
+
+
+@scenario("monsters_search_text")
+async def monsters_search_text(ctx):
+    await ctx.timed("GET", "/search/monsters", params={"query": ctx.search_word("monsters"), "limit": 50})
+
+
+@scenario("monsters_search_fuzzy")
+async def monsters_search_fuzzy(ctx):
+    params = {"query": ctx.typo(ctx.search_word("monsters")), "limit": 50, "mode": "fuzzy"}
+    await ctx.timed("GET", "/search/monsters", params=params)
+
+
+@scenario("monsters_export", heavy=True)
+async def monsters_export(ctx):
+    await ctx.timed("GET", "/export/monsters")
+
+
+@scenario("monsters_export_bson", heavy=True)
+async def monsters_export_bson(ctx):
+    await ctx.timed("GET", "/export/monsters", headers=BSON_HEADERS)
+
+
+def register_writes(collection: str):
+    singular = collection[:-1]
+
+    @scenario(f"{singular}_create", writes=True)
+    async def create(ctx):
+        response = await ctx.timed("POST", f"/{collection}", json=ctx.new_doc(collection))
+        if response is not None and response.status_code == 201:
+            ctx.scratch[collection].append(response.json()["_id"])
+
+    @scenario(f"{singular}_put", writes=True)
+    async def put(ctx):
+        doc_id, = await ctx.scratch_ids(collection)
+        await ctx.timed("PUT", f"/{collection}/{doc_id}", json=ctx.new_doc(collection))
+
+    @scenario(f"{singular}_patch", writes=True)
+    async def patch(ctx):
+        doc_id, = await ctx.scratch_ids(collection)
+        await ctx.timed("PATCH", f"/{collection}/{doc_id}", json={"desc": description(ctx.rng)})
+
+    @scenario(f"{singular}_delete", writes=True)
+    async def delete(ctx):
+        doc_id, = await ctx.take_scratch(collection)
+        await ctx.timed("DELETE", f"/{collection}/{doc_id}")
+
+    @scenario(f"{collection}_bulk_create", writes=True)
+    async def bulk_create(ctx):
+        body = "\n".join(json.dumps(ctx.new_doc(collection)) for _ in range(BULK_WRITE_SIZE))
+        response = await ctx.timed("POST", f"/{collection}/bulk", content=body, headers=NDJSON_HEADERS)
+        if response is not None and response.status_code == 200:
+            ctx.scratch[collection].extend(
+                result["id"] for result in response.json()["results"] if result["status"] == "inserted"
+            )
+
+    @scenario(f"{collection}_bulk_patch", writes=True)
+    async def bulk_patch(ctx):
+        ids = await ctx.scratch_ids(collection, BULK_WRITE_SIZE)
+        records = [{"_id": doc_id, "desc": description(ctx.rng)} for doc_id in ids]
+        await ctx.timed("PATCH", f"/{collection}/bulk", json=records)
+
+    @scenario(f"{collection}_bulk_delete", writes=True)
+    async def bulk_delete(ctx):
+        ids = await ctx.take_scratch(collection, BULK_WRITE_SIZE)
+        await ctx.timed("DELETE", f"/{collection}/bulk", json={"ids": ids})
+
+
+register_writes("items")
+register_writes("monsters")
+
+
+def selected_scenarios(args) -> list:
+    if args.routes:
+        unknown = sorted(set(args.routes) - set(SCENARIOS))
+        if unknown:
+            sys.exit(f"Unknown routes: {', '.join(unknown)}. Available: {', '.join(SCENARIOS)}")
+        return list(args.routes)
+    return [
+        name for name, (_, writes, heavy) in SCENARIOS.items()
+        if (args.writes or not writes) and (args.heavy or not heavy)
+    ]
+
+
+async def run_scenario(ctx: Context, run, args) -> dict:
+    for _ in range(args.warmup):
+        await run(ctx)
+    ctx.recorder = Recorder()
+
+    deadline = time.perf_counter() + args.duration
+    budget = [args.requests]
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            if args.requests:
+                if budget[0] <= 0:
+                    return
+                budget[0] -= 1
+            await run(ctx)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return ctx.recorder.summary(time.perf_counter() - started)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    names = selected_scenarios(args)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        items = await sample_ids(client, "items", args.sample_size, args.seed)
+        monsters = await sample_ids(client, "monsters", args.sample_size, args.seed)
+        if not items or not monsters:
+            sys.exit("No data to benchmark against, run the seed command first")
+
+        report = {
+            "meta": {
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "label": args.label,
+                "url": args.url,
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "concurrency": args.concurrency,
+                "duration_s": args.duration,
+                "requests": args.requests,
+                "warmup": args.warmup,
+                "sample_size": args.sample_size,
+                # Id routes may be served from the document cache, runs are only comparable with the same size
+                "doc_cache_size": await doc_cache_size(client),
+            },
+            "routes": {},
+        }
+        ctx = Context(client, items, monsters, args.seed)
+        try:
+            for name in names:
+                result = await run_scenario(ctx, SCENARIOS[name][0], args)
+                report["routes"][name] = result
+                latency = result["latency_ms"]
+                print(
+                    f"{name:26} {result['throughput_rps']:>9} rps  p50 {latency['p50']}  p95 {latency['p95']}  "
+                    f"p99 {latency['p99']} ms  errors {result['errors']}",
+                    file=sys.stderr
+                )
+        finally:
+            await ctx.cleanup()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+def change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    for key in ("label", "concurrency", "duration_s", "requests", "doc_cache_size"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"Warning: {key} differs ({baseline['meta'].get(key)} vs {current['meta'].get(key)})")
+
+    regressions = []
+    print(f"{'route':26} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>9}")
+    for name, result in current["routes"].items():
+        before = baseline["routes"].get(name)
+        if before is None:
+            continue
+        deltas = [change(before["latency_ms"][key], result["latency_ms"][key]) for key in ("p50", "p95", "p99")]
+        deltas.append(change(before["throughput_rps"], result["throughput_rps"]))
+        print(f"{name:26} " + " ".join(f"{delta:>+9.1%}" if delta is not None else f"{'-':>9}" for delta in deltas))
+        if deltas[1] is not None and deltas[1] > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"p95 regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed and load test the D&D API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Insert synthetic items and monsters through the bulk endpoints")
+    seed_parser.add_argument("--url", default=DEFAULT_URL)
+    seed_parser.add_argument("--scale", type=parse_scale, default=SCALES["1k"], help="1k, 10k, 100k, 1m or a number")
+    seed_parser.add_argument("--seed", type=int, default=0)
+
+    run_parser = commands.add_parser("run", help="Drive the routes and report latency percentiles as JSON")
+    run_parser.add_argument("--url", default=DEFAULT_URL)
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--duration", type=float, default=10, help="Seconds per route")
+    run_parser.add_argument("--requests", type=int, default=0, help="Stop a route after this many requests")
+    run_parser.add_argument("--warmup", type=int, default=10, help="Untimed requests before each route")
+    run_parser.add_argument("--routes", nargs="+", help=f"Subset of: {', '.join(SCENARIOS)}")
+    run_parser.add_argument("--writes", action="store_true", help="Include the write routes")
+    run_parser.add_argument("--heavy", action="store_true", help="Include the full collection exports")
+    run_parser.add_argument("--label", help="Free-form tag stored with the results, e.g. the seeded scale")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument(
+        "--sample-size", type=int, default=SAMPLE_SIZE,
+        help="Ids drawn from the whole collection for the id routes, keep it above DOC_CACHE_SIZE"
+    )
+    run_parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+
+    compare_parser = commands.add_parser("compare", help="Compare two JSON reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Allowed p95 increase, 0.1 = 10%%")
+
+    args = parser.parse_args()
+    if args.command == "seed":
+        asyncio.run(seed(args))
+    elif args.command == "run":
+        asyncio.run(run(args))
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
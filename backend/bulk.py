@@ -0,0 +1,280 @@
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from pydantic import ValidationError
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from search import is_search_key
+
+BULK_CHUNK_SIZE = 1000
+MAX_BULK_RECORDS = 50000
+DUPLICATE_KEY_ERROR = 11000
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class InvalidRecord:
+    def __init__(self, error: str):
+        self.error = error
+
+
+# Accepts either a JSON array or NDJSON (one record per line, selected by Content-Type)
+def parse_records(body: bytes, content_type: str) -> list:
+    if content_type.split(";")[0].strip() in NDJSON_CONTENT_TYPES:
+        records = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                records.append(InvalidRecord(f"Invalid JSON: {e}"))
+    else:
+        try:
+            records = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of records")
+
+    if len(records) > MAX_BULK_RECORDS:
+        raise HTTPException(status_code=413, detail=f"Too many records, the limit is {MAX_BULK_RECORDS}")
+    return records
+
+
+def error_result(index: int, error: str) -> dict:
+    return {"index": index, "status": "error", "error": error}
+
+
+def format_validation_error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+def validate_records(records: list, model):
+    docs, results = [], []
+    for index, record in enumerate(records):
+        if isinstance(record, InvalidRecord):
+            results.append(error_result(index, record.error))
+            continue
+        try:
+            validated = model.model_validate(record)
+        except ValidationError as e:
+            results.append(error_result(index, format_validation_error(e)))
+            continue
+        docs.append((index, {**validated.model_dump(by_alias=True, exclude={"id"}), "version": 0}))
+    return docs, results
+
+
+# Update records carry the target _id next to the fields to change, and optionally the version
+# the client last read. That one is kept under "version" for the checks and is never written.
+def validate_updates(records: list, model):
+    docs, results, seen = [], [], set()
+    for index, record in enumerate(records):
+        if isinstance(record, InvalidRecord):
+            results.append(error_result(index, record.error))
+            continue
+        try:
+            validated = model.model_validate(record)
+        except ValidationError as e:
+            results.append(error_result(index, format_validation_error(e)))
+            continue
+        if validated.id is None:
+            results.append(error_result(index, "Missing _id"))
+            continue
+        try:
+            obj_id = ObjectId(validated.id)
+        except InvalidId:
+            results.append(error_result(index, "Invalid ID format"))
+            continue
+        # The writes are unordered, two updates of one document would race
+        if obj_id in seen:
+            results.append(error_result(index, "Duplicate _id in request"))
+            continue
+        seen.add(obj_id)
+        fields = validated.to_update()
+        if not fields:
+            results.append(error_result(index, "No fields to update"))
+            continue
+        doc = {"_id": obj_id, **fields}
+        if validated.version is not None:
+            doc["version"] = validated.version
+        docs.append((index, doc))
+    return docs, results
+
+
+def parse_ids(ids: list):
+    docs, results, seen = [], [], set()
+    for index, raw_id in enumerate(ids):
+        try:
+            obj_id = ObjectId(raw_id)
+        except (InvalidId, TypeError):
+            results.append(error_result(index, "Invalid ID format"))
+            continue
+        if obj_id in seen:
+            results.append(error_result(index, "Duplicate _id in request"))
+            continue
+        seen.add(obj_id)
+        docs.append((index, {"_id": obj_id}))
+    return docs, results
+
+
+# Targets that do not exist or have moved past the expected version are reported up front
+# with one $in query, bulk_write only returns totals
+async def filter_missing_docs(collection, docs: list, results: list, label: str) -> list:
+    wanted = list({doc["_id"] for _, doc in docs})
+    cursor = collection.find({"_id": {"$in": wanted}}, {"version": 1})
+    found = {doc["_id"]: doc.get("version", 0) async for doc in cursor}
+
+    checked = []
+    for index, doc in docs:
+        if doc["_id"] not in found:
+            results.append(error_result(index, f"{label} not found"))
+            continue
+        if "version" in doc and doc["version"] != found[doc["_id"]]:
+            results.append(error_result(index, f"{label} was changed by someone else, reload it first"))
+            continue
+        checked.append((index, doc))
+    return checked
+
+
+# All held items referenced by the batch are checked with one $in query
+async def filter_missing_held_items(items_collection, docs: list, results: list) -> list:
+    wanted, remaining = set(), []
+    for index, doc in docs:
+        held_id = doc.get("held_item_id")
+        if not held_id:
+            remaining.append((index, doc))
+            continue
+        try:
+            wanted.add(ObjectId(held_id))
+        except InvalidId:
+            results.append(error_result(index, "Invalid held_item_id format"))
+            continue
+        remaining.append((index, doc))
+
+    found = {str(doc["_id"]) async for doc in items_collection.find({"_id": {"$in": list(wanted)}}, {"_id": 1})}
+
+    checked = []
+    for index, doc in remaining:
+        held_id = doc.get("held_item_id")
+        if held_id and held_id not in found:
+            results.append(error_result(index, "The specified held_item_id does not exist"))
+            continue
+        checked.append((index, doc))
+    return checked
+
+
+async def insert_chunks(collection, docs: list, results: list, label: str):
+    for start in range(0, len(docs), BULK_CHUNK_SIZE):
+        chunk = docs[start:start + BULK_CHUNK_SIZE]
+        write_errors = {}
+        try:
+            await collection.insert_many([doc for _, doc in chunk], ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                if err["code"] == DUPLICATE_KEY_ERROR:
+                    write_errors[err["index"]] = f"{label} already exists"
+                else:
+                    write_errors[err["index"]] = err["errmsg"]
+
+        # insert_many sets _id on every document it was given, failed ones are reported by position
+        for position, (index, doc) in enumerate(chunk):
+            if position in write_errors:
+                results.append(error_result(index, write_errors[position]))
+            else:
+                results.append({"index": index, "status": "inserted", "id": str(doc["_id"])})
+
+
+def update_fields(doc: dict) -> dict:
+    return {key: value for key, value in doc.items() if key not in ("_id", "version")}
+
+
+# The expected version stays in the filter, so a write racing past the pre-check still matches nothing
+def update_operation(doc: dict):
+    query = {"_id": doc["_id"]}
+    if "version" in doc:
+        query["version"] = doc["version"]
+    return UpdateOne(query, {"$set": update_fields(doc), "$inc": {"version": 1}})
+
+
+def delete_operation(doc: dict):
+    return DeleteOne({"_id": doc["_id"]})
+
+
+# BulkWriteResult attribute and raw result key holding how many operations found their target
+APPLIED_COUNTS = {"updated": ("matched_count", "nMatched"), "deleted": ("deleted_count", "nRemoved")}
+
+
+# Called when fewer targets matched than operations were sent, i.e. something changed after the pre-check.
+# Returns id -> error for the writes that did not apply.
+async def find_missed(collection, docs: list, label: str, status: str) -> dict:
+    # Two deletes racing for the same document both leave it gone, and totals can't tell which one matched.
+    # Both report it deleted, a repeated delete in the change log is a no-op for every reader.
+    if status == "deleted":
+        return {}
+
+    fields = {key for doc in docs for key in update_fields(doc) if not is_search_key(key)}
+    projection = {"version": 1, **dict.fromkeys(fields, 1)}
+    cursor = collection.find({"_id": {"$in": [doc["_id"] for doc in docs]}}, projection)
+    found = {doc["_id"]: doc async for doc in cursor}
+
+    missed = {}
+    for doc in docs:
+        stored = found.get(doc["_id"])
+        if stored is None:
+            missed[doc["_id"]] = f"{label} not found"
+        elif "version" in doc and not looks_applied(doc, stored):
+            missed[doc["_id"]] = f"{label} was changed by someone else, reload it first"
+    return missed
+
+
+# A versioned update that lost the race matched nothing, but the document still moved past the expected
+# version. It counts as applied only if the stored fields are the ones it wrote.
+def looks_applied(doc: dict, stored: dict) -> bool:
+    if stored.get("version", 0) <= doc["version"]:
+        return False
+    return all(stored.get(key) == value for key, value in update_fields(doc).items() if not is_search_key(key))
+
+
+async def write_chunks(collection, docs: list, results: list, label: str, to_operation, status: str):
+    for start in range(0, len(docs), BULK_CHUNK_SIZE):
+        chunk = docs[start:start + BULK_CHUNK_SIZE]
+        write_errors = {}
+        attribute, key = APPLIED_COUNTS[status]
+        try:
+            result = await collection.bulk_write([to_operation(doc) for _, doc in chunk], ordered=False)
+            applied = getattr(result, attribute)
+        except BulkWriteError as e:
+            applied = e.details.get(key, 0)
+            for err in e.details.get("writeErrors", []):
+                if err["code"] == DUPLICATE_KEY_ERROR:
+                    write_errors[err["index"]] = f"{label} already exists"
+                else:
+                    write_errors[err["index"]] = err["errmsg"]
+
+        # A target deleted or changed between the pre-check and the write matches nothing,
+        # which only shows in the totals
+        missed = {}
+        attempted = [doc for position, (_, doc) in enumerate(chunk) if position not in write_errors]
+        if applied < len(attempted):
+            missed = await find_missed(collection, attempted, label, status)
+
+        for position, (index, doc) in enumerate(chunk):
+            if position in write_errors:
+                results.append(error_result(index, write_errors[position]))
+            elif doc["_id"] in missed:
+                results.append(error_result(index, missed[doc["_id"]]))
+            else:
+                results.append({"index": index, "status": status, "id": str(doc["_id"])})
+
+
+def written_docs(docs: list, results: list) -> list:
+    written = {result["index"] for result in results if result["status"] != "error"}
+    return [doc for index, doc in docs if index in written]
+
+
+def bulk_report(results: list, status: str = "inserted") -> dict:
+    results.sort(key=lambda result: result["index"])
+    succeeded = sum(1 for result in results if result["status"] == status)
+    return {status: succeeded, "failed": len(results) - succeeded, "results": results}
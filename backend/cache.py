@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+
+
+# LRU cache with a TTL for documents read by id. It lives in the worker process,
+# so with several workers the TTL bounds how long another worker's write can stay unseen.
+class DocumentCache:
+    def __init__(self, max_size: int, ttl: float, primary_after_write: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> when this worker last wrote it, oldest first. Kept for primary_after_write seconds,
+        # also with the cache off, see written_recently().
+        self.primary_after_write = primary_after_write
+        self.writes = OrderedDict()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> generation of its last invalidation, oldest first. Bounded, the newest generation that
+        # was dropped is kept so a read older than that is treated as stale for every key.
+        self.generations = OrderedDict()
+        self.current_generation = 0
+        self.forgotten_generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, doc = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return doc
+
+    # Taken before a read that may fill the cache, see set()
+    def generation(self) -> int:
+        return self.current_generation
+
+    # A read that started before the key was last invalidated may have loaded the old document,
+    # caching it would undo the invalidation until the TTL runs out
+    def set(self, key, doc, generation: int = None):
+        if not self.enabled:
+            return
+        if generation is not None and (
+            self.generations.get(key, 0) > generation or self.forgotten_generation > generation
+        ):
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, doc)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+        if self.primary_after_write > 0:
+            now = time.monotonic()
+            self.writes[key] = now
+            self.writes.move_to_end(key)
+            while next(iter(self.writes.values())) < now - self.primary_after_write:
+                self.writes.popitem(last=False)
+        if not self.enabled:
+            return
+        self.current_generation += 1
+        self.generations[key] = self.current_generation
+        self.generations.move_to_end(key)
+        while len(self.generations) > self.max_size:
+            _, self.forgotten_generation = self.generations.popitem(last=False)
+
+    # Reads of a key this worker wrote moments ago go to the primary, a lagging secondary would return
+    # the document as it was before the write and the cache would keep that copy for the whole TTL
+    def written_recently(self, key) -> bool:
+        written_at = self.writes.get(key)
+        return written_at is not None and written_at >= time.monotonic() - self.primary_after_write
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
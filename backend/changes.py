@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+from pymongo import ASCENDING, IndexModel
+
+from etag import bump_version
+from search import is_search_key
+
+
+# Append-only log of API writes. Each entry carries the collection version the write produced,
+# so it doubles as the source for the /events polling fallback.
+class ChangeLog:
+    def __init__(self, changes_collection, versions_collection, retention: int, version_cache=None):
+        self.changes_collection = changes_collection
+        self.versions_collection = versions_collection
+        self.retention = retention
+        self.version_cache = version_cache
+
+    async def create_indexes(self):
+        await self.changes_collection.create_indexes([
+            IndexModel([("coll", ASCENDING), ("version", ASCENDING)], unique=True),
+            IndexModel("ts", expireAfterSeconds=self.retention),
+        ])
+
+    async def record(self, coll: str, op: str, doc_id=None, fields: dict = None):
+        await self.record_many(coll, [(op, doc_id, fields)])
+
+    async def record_many(self, coll: str, entries: list):
+        if not entries:
+            return
+        last_version = await bump_version(self.versions_collection, coll, len(entries))
+        first_version = last_version - len(entries) + 1
+        if self.version_cache is not None:
+            self.version_cache.update(coll, last_version)
+        now = datetime.now(timezone.utc)
+
+        await self.changes_collection.insert_many([
+            {
+                "coll": coll, "version": first_version + offset, "op": op, "id": doc_id,
+                "fields": {
+                    key: value for key, value in fields.items() if key != "_id" and not is_search_key(key)
+                } if fields else None,
+                "ts": now,
+            }
+            for offset, (op, doc_id, fields) in enumerate(entries)
+        ], ordered=False)
+
+    # Tells clients to drop what they have for the collection (seeding, migrations, new release)
+    async def reset(self, coll: str):
+        await self.record(coll, "reset")
+
+    # Called at startup: resets only when startup changed stored documents or the collection was last served
+    # by another release, so plain restarts keep clients' incremental sync. The release is kept on the counter.
+    async def reset_on_change(self, coll: str, changed: bool, release: str):
+        counter = await self.versions_collection.find_one({"_id": coll})
+        if not changed and counter and counter.get("release") == release:
+            return
+        await self.reset(coll)
+        await self.versions_collection.update_one({"_id": coll}, {"$set": {"release": release}})
+
+    async def latest_version(self, coll: str) -> int:
+        counter = await self.versions_collection.find_one({"_id": coll})
+        return counter["version"] if counter else 0
+
+    # Entries after `since` in version order. A client is told to reset when that range is no longer
+    # complete in the log (expired, or `since` was issued by a different database); limit=0 only reads the version.
+    async def changes_since(self, coll: str, since: int, limit: int) -> dict:
+        latest = await self.latest_version(coll)
+        page = {"collection": coll, "version": latest, "latest": latest, "reset": False, "more": False, "changes": []}
+        if since > latest:
+            page["reset"] = True
+        if not limit or since >= latest:
+            return page
+
+        cursor = self.changes_collection.find({"coll": coll, "version": {"$gt": since}})
+        entries = await cursor.sort("version", 1).limit(limit).to_list(limit)
+        if not entries or entries[0]["version"] != since + 1:
+            page["reset"] = True
+            return page
+
+        page["version"] = entries[-1]["version"]
+        page["more"] = page["version"] < latest
+        page["changes"] = entries
+        return page
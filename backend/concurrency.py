@@ -0,0 +1,43 @@
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from typing import Optional
+
+from search import SEARCH_EXCLUSION
+
+
+# If-Match carries the document version as an entity tag ("3", as sent in the ETag of GET /items/{id}),
+# an expanded response's tag (W/"3.<held item id>.7") names the document version first.
+# "*" only requires the document to exist.
+def expected_version(if_match: Optional[str], body_version: Optional[int] = None) -> Optional[int]:
+    if if_match is None or if_match.strip() == "*":
+        return body_version
+    try:
+        version = int(if_match.strip().removeprefix("W/").strip('"').split(".", 1)[0])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a document version")
+    if body_version is not None and body_version != version:
+        raise HTTPException(status_code=400, detail="If-Match and version do not agree")
+    return version
+
+
+# Every write bumps the document's version. With an expected version the update only applies
+# if nobody else wrote in between, otherwise the caller gets 412 and has to reload.
+async def update_versioned(collection, obj_id, update_data: dict, expected: Optional[int], label: str) -> dict:
+    query = {"_id": obj_id}
+    if expected is not None:
+        query["version"] = expected
+
+    try:
+        result = await collection.find_one_and_update(
+            query, {"$set": update_data, "$inc": {"version": 1}}, SEARCH_EXCLUSION,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=f"{label} already exists")
+
+    if result is None:
+        if expected is not None and await collection.find_one({"_id": obj_id}, {"_id": 1}):
+            raise HTTPException(status_code=412, detail=f"{label} was changed by someone else, reload it first")
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    return result
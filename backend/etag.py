@@ -0,0 +1,93 @@
+import time
+from typing import Optional
+from fastapi import HTTPException, Request, Response
+from pymongo import ReturnDocument
+
+from export import wants_bson
+
+
+# Writes bump a per-collection counter, so list/detail ETags never need the data itself
+async def bump_version(versions_collection, name: str, amount: int = 1) -> int:
+    counter = await versions_collection.find_one_and_update(
+        {"_id": name}, {"$inc": {"version": amount}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return counter["version"]
+
+
+# Collection versions held in process, so conditional GETs don't cost a round trip each. Writes from other
+# processes show up once the TTL runs out. The counters must be read with the same read preference as the data
+# and before it: an ETag may then lag the body it is sent with, which only costs a refetch, but never run ahead
+# of it, which would pin a stale body behind 304s.
+class VersionCache:
+    def __init__(self, versions_collection, ttl: float, follow_writes: bool = True):
+        self.versions_collection = versions_collection
+        self.ttl = ttl
+        # Reads on the primary see a local write as soon as it is acknowledged, so its version can be used
+        # right away. With reads on secondaries it is dropped instead and read back from them.
+        self.follow_writes = follow_writes
+        self.versions = {}  # name -> (expires_at, version)
+
+    def update(self, name: str, version: int):
+        if not self.follow_writes:
+            self.versions.pop(name, None)
+        elif version > self.versions.get(name, (0, 0))[1]:
+            self.versions[name] = (time.monotonic() + self.ttl, version)
+
+    async def get(self, names: tuple) -> dict:
+        now = time.monotonic()
+        expired = [name for name in names if self.versions.get(name, (0, 0))[0] <= now]
+        if expired:
+            cursor = self.versions_collection.find({"_id": {"$in": expired}})
+            found = {doc["_id"]: doc["version"] async for doc in cursor}
+            expires_at = time.monotonic() + self.ttl
+            for name in expired:
+                # Counters only grow, a local write that finished during the read may already have a newer one
+                version = found.get(name, 0)
+                if self.follow_writes:
+                    version = max(version, self.versions.get(name, (0, 0))[1])
+                self.versions[name] = (expires_at, version)
+        return {name: self.versions[name][1] for name in names}
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+
+# Dependency factory: answers 304 before the endpoint runs, otherwise sets the ETag header.
+# Routes that can also answer in BSON (negotiated=True) tag each representation separately.
+def collection_etag(version_cache: VersionCache, *names: str, negotiated: bool = False):
+    async def check_etag(request: Request, response: Response) -> str:
+        versions = await version_cache.get(names)
+        tag = "-".join(f"{name}.{versions.get(name, 0)}" for name in names)
+        headers = {}
+        if negotiated:
+            headers["Vary"] = "Accept"
+            if wants_bson(request):
+                tag += "-bson"
+        etag = f'W/"{tag}"'
+
+        if if_none_match(request, etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag, **headers})
+        response.headers.update({"ETag": etag, **headers})
+        return etag
+    return check_etag
+
+
+# Detail routes tag the document itself with a strong ETag holding its version, the same value If-Match takes,
+# so a client can send back what it got. An embedded document adds its reference (<embedded>_id) and its version,
+# "-" when unset or not found, and makes the tag weak: deleting or replacing the embedded document changes the tag.
+def document_etag(request: Request, response: Response, doc: dict, embedded: Optional[str] = None) -> str:
+    etag = f'"{doc.get("version", 0)}"'
+    if embedded:
+        reference = doc.get(f"{embedded}_id") or "-"
+        found = doc.get(embedded)
+        embedded_version = found.get("version", 0) if found else "-"
+        etag = f'W/"{doc.get("version", 0)}.{reference}.{embedded_version}"'
+
+    if if_none_match(request, etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return etag
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import time
+from pymongo.errors import OperationFailure, PyMongoError
+
+from export import to_json_default
+from search import is_search_key
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+HEARTBEAT_INTERVAL = 15
+RETRY_DELAY = 2
+# How long the poller waits for a missing change log version before skipping it
+GAP_TIMEOUT = 5
+CHANGE_STREAMS_UNSUPPORTED = 40573
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+def change_stream_event(change: dict) -> dict:
+    event = {"collection": change["ns"]["coll"], "op": change["operationType"], "id": change["documentKey"]["_id"]}
+    if change["operationType"] in ("insert", "replace"):
+        event["fields"] = {
+            key: value for key, value in change["fullDocument"].items() if key != "_id" and not is_search_key(key)
+        }
+    elif change["operationType"] == "update":
+        updated = change["updateDescription"].get("updatedFields", {})
+        event["fields"] = {key: value for key, value in updated.items() if not is_search_key(key)}
+        event["removed"] = change["updateDescription"].get("removedFields", [])
+    return event
+
+
+def change_log_event(entry: dict) -> dict:
+    event = {"collection": entry["coll"], "op": entry["op"], "id": entry["id"], "version": entry["version"]}
+    if entry.get("fields") is not None:
+        event["fields"] = entry["fields"]
+    return event
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['op']}\ndata: {json.dumps(event, default=to_json_default)}\n\n"
+
+
+# One tailing task per process fans events out to every connected client,
+# so the database work scales with the number of writes, not with the number of listeners
+class EventHub:
+    def __init__(self, db, collections: tuple, changes_collection, versions_collection, poll_interval: float):
+        self.db = db
+        self.collections = collections
+        self.changes_collection = changes_collection
+        self.versions_collection = versions_collection
+        self.poll_interval = poll_interval
+        self.subscribers = set()
+        self.task = None
+        self.mode = "change_stream"
+        self.resume_token = None
+        self.last_versions = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self.task:
+            self.task.cancel()
+            self.task = None
+            # The next subscriber starts from "now", not from where the last one left off
+            self.resume_token = None
+            self.last_versions = None
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def publish(self, event: dict):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client that can't keep up gets a reset instead of an unbounded backlog
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"op": "reset"})
+
+    async def stream(self):
+        queue = self.subscribe()
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            self.unsubscribe(queue)
+
+    async def run(self):
+        while True:
+            try:
+                if self.mode == "change_stream":
+                    await self.tail_change_streams()
+                else:
+                    await self.poll_change_log()
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    print("Change streams are not available, falling back to polling the change log")
+                    self.mode = "polling"
+                    continue
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    self.resume_token = None
+                    self.publish({"op": "reset"})
+                print(f"Event stream error: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+            except PyMongoError as e:
+                print(f"Event stream error: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def tail_change_streams(self):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(self.collections)},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+        }}]
+        async with await self.db.watch(pipeline, resume_after=self.resume_token) as stream:
+            async for change in stream:
+                self.resume_token = stream.resume_token
+                self.publish(change_stream_event(change))
+
+    async def poll_change_log(self):
+        if self.last_versions is None:
+            cursor = self.versions_collection.find({"_id": {"$in": list(self.collections)}})
+            self.last_versions = {counter["_id"]: counter["version"] async for counter in cursor}
+
+        gap_since = {}
+        while True:
+            query = {"$or": [
+                {"coll": coll, "version": {"$gt": self.last_versions.get(coll, 0)}} for coll in self.collections
+            ]}
+            async for entry in self.changes_collection.find(query).sort("version", 1):
+                coll = entry["coll"]
+                if entry["version"] > self.last_versions.get(coll, 0) + 1:
+                    # Versions are handed out before the log entry is written, a lower one may still be in flight
+                    started = gap_since.setdefault(coll, time.monotonic())
+                    if time.monotonic() - started < GAP_TIMEOUT:
+                        continue
+                gap_since.pop(coll, None)
+                self.last_versions[coll] = entry["version"]
+                self.publish(change_log_event(entry))
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,23 @@
+from search import SEARCH_FIELD
+
+# held_item_id is an ObjectId in the seed data but a string when written through the API,
+# so it is normalised before the join to let $lookup use the _id index on items
+HELD_ITEM_LOOKUP = [
+    {"$addFields": {
+        "_held_item_oid": {"$convert": {"input": "$held_item_id", "to": "objectId", "onError": None, "onNull": None}}
+    }},
+    {"$lookup": {"from": "items", "localField": "_held_item_oid", "foreignField": "_id", "as": "held_item"}},
+    {"$set": {"held_item": {"$arrayElemAt": ["$held_item", 0]}}},
+    {"$project": {"_held_item_oid": 0, f"held_item.{SEARCH_FIELD}": 0}},
+]
+
+
+def expand_stages(expand) -> list:
+    return HELD_ITEM_LOOKUP if expand == "held_item" else []
+
+
+# A projected response still needs held_item_id for the join and held_item in the output
+def expand_fields(selected, expand):
+    if selected is None or not expand:
+        return selected
+    return tuple(sorted({*selected, "held_item_id", "held_item"}))
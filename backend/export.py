@@ -0,0 +1,73 @@
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from fastapi import Request, Response
+from pydantic_core import to_json
+
+from search import SEARCH_EXCLUSION
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+BSON_MEDIA_TYPE = "application/bson"
+RAW_BSON_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def to_json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_json(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=to_json_default)
+    return to_json(data, fallback=to_json_default)
+
+
+def wants_bson(request: Request) -> bool:
+    return BSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+# Documents read through this stay as the BSON bytes the server sent, fields are only decoded when accessed
+def raw_collection(collection):
+    return collection.with_options(codec_options=RAW_BSON_OPTIONS)
+
+
+# Streams documents straight off the driver cursor, one NDJSON chunk per server batch.
+# Nothing is collected into a list, so memory stays at a single batch whatever the collection size.
+async def stream_ndjson(collection, batch_size: int):
+    cursor = collection.find({}, SEARCH_EXCLUSION, batch_size=batch_size).sort("_id", 1)
+    lines = []
+    try:
+        async for doc in cursor:
+            lines.append(dump_json(doc))
+            if len(lines) >= batch_size:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    finally:
+        await cursor.close()
+
+
+# Each server batch arrives as concatenated BSON documents, which is already the response format
+# (the same as a mongodump .bson file), so the bytes are passed through without decoding a single document
+async def stream_bson(collection, batch_size: int):
+    cursor = collection.find_raw_batches({}, SEARCH_EXCLUSION, batch_size=batch_size).sort("_id", 1)
+    try:
+        async for batch in cursor:
+            yield batch
+    finally:
+        await cursor.close()
+
+
+# A page read through raw_collection(), with the next cursor moved to a header since BSON has no envelope
+def render_bson(page: dict, headers=None) -> Response:
+    response = Response(b"".join(doc.raw for doc in page["data"]), media_type=BSON_MEDIA_TYPE, headers=headers)
+    if page["next"]:
+        response.headers["X-Next-Cursor"] = page["next"]
+    return response
@@ -0,0 +1,56 @@
+from pydantic import BaseModel
+
+ITEM_RANGE_FIELDS = ("weight", "value_cp")
+ITEM_EQUALITY_FIELDS = ("rarity",)
+ITEM_SORT_FIELDS = ("name", *ITEM_RANGE_FIELDS)
+
+MONSTER_RANGE_FIELDS = (
+    "challenge_num", "ac", "hp", "strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma"
+)
+MONSTER_EQUALITY_FIELDS = ("challenge", "speed")
+MONSTER_SORT_FIELDS = ("name", *MONSTER_RANGE_FIELDS)
+
+# Every index ends with _id so that sorted keyset pages stay on the index.
+# Equality fields go first, then the sort/range field (equality, sort, range ordering).
+ITEM_INDEXES = [
+    [("name", 1), ("_id", 1)],
+    *[[(field, 1), ("_id", 1)] for field in ITEM_RANGE_FIELDS],
+    [("rarity", 1), ("_id", 1)],
+    [("rarity", 1), ("weight", 1), ("_id", 1)],
+    [("rarity", 1), ("value_cp", 1), ("_id", 1)],
+]
+MONSTER_INDEXES = [
+    [("name", 1), ("_id", 1)],
+    *[[(field, 1), ("_id", 1)] for field in MONSTER_RANGE_FIELDS],
+    [("challenge", 1), ("_id", 1)],
+    [("challenge", 1), ("ac", 1), ("_id", 1)],
+    [("challenge", 1), ("hp", 1), ("_id", 1)],
+    [("speed", 1), ("_id", 1)],
+]
+
+
+def build_query(filters: BaseModel, range_fields: tuple, equality_fields: tuple) -> dict:
+    values = filters.model_dump(exclude_none=True)
+    query = {}
+
+    for field in equality_fields:
+        if field in values:
+            query[field] = values[field]
+
+    for field in range_fields:
+        bounds = {}
+        if f"{field}_min" in values:
+            bounds["$gte"] = values[f"{field}_min"]
+        if f"{field}_max" in values:
+            bounds["$lte"] = values[f"{field}_max"]
+        if bounds:
+            query[field] = bounds
+    return query
+
+
+def item_query(filters: BaseModel) -> dict:
+    return build_query(filters, ITEM_RANGE_FIELDS, ITEM_EQUALITY_FIELDS)
+
+
+def monster_query(filters: BaseModel) -> dict:
+    return build_query(filters, MONSTER_RANGE_FIELDS, MONSTER_EQUALITY_FIELDS)
@@ -4,15 +4,50 @@ from bson import ObjectId
 from bson.errors import InvalidId
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from pymongo import AsyncMongoClient
-from typing import List
-
-from models import ItemModel, MonsterModel
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pymongo import AsyncMongoClient, IndexModel, read_preferences
+from pymongo.errors import DuplicateKeyError
+from typing import Annotated, List, Literal, Optional
+
+from batch import batch_get
+from bulk import (
+    bulk_report, delete_operation, filter_missing_docs, filter_missing_held_items, insert_chunks, parse_ids,
+    parse_records, update_fields, update_operation, validate_records, validate_updates, write_chunks, written_docs
+)
+from cache import DocumentCache
+from changes import ChangeLog
+from concurrency import expected_version, update_versioned
+from expand import expand_fields, expand_stages
+from etag import VersionCache, collection_etag, document_etag
+from events import EventHub
+from export import (
+    BSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, raw_collection, render_bson, stream_bson, stream_ndjson, wants_bson
+)
+from filters import ITEM_INDEXES, ITEM_SORT_FIELDS, MONSTER_INDEXES, MONSTER_SORT_FIELDS, item_query, monster_query
+from models import (
+    BatchGetRequest, BulkDeleteReport, BulkDeleteRequest, BulkReport, BulkUpdateReport, ChangesPage,
+    ExpandedMonsterModel, Expand, ItemBatchReport, ItemFilters, ItemModel, ItemPage, ItemSearchHit, ItemUpdate,
+    MonsterBatchReport, MonsterFilters, MonsterModel, MonsterPage, MonsterSearchHit, MonsterUpdate, ReturnMode,
+    SearchMode
+)
+from metrics import (
+    PROMETHEUS_MEDIA_TYPE, Counter, Gauge, HttpMetrics, MetricsMiddleware, MongoMetrics, PoolMetrics, render_metrics
+)
+from migrations import backfill_numeric_fields, backfill_search_words, backfill_versions, ensure_unique_names
+from pagination import MAX_PAGE_SIZE, paginate, parse_sort
+from projection import parse_fields, render_fast, render_fields, to_projection
+from search import (
+    SEARCH_EXCLUSION, SEARCH_FIELD, SEARCH_INDEXES, SearchVocabulary, fuzzy_search, hit_fields, search_updates,
+    search_words, text_search
+)
+from settings import client_options, read_preference, write_concern
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Documents changed by seeding and migrations, clients are only told to resync when there are any
+    modified = 0
     i_count = await items_collection.count_documents({})
     if i_count == 0:
         items_seed_data = [
@@ -24,7 +59,11 @@ async def lifespan(app: FastAPI):
         ]
         await items_collection.insert_many(items_seed_data)
         print("Successfully seeded 5 items!")
+        modified += len(items_seed_data)
     await items_collection.create_index([("name", "text"), ("desc", "text")])
+    modified += await ensure_unique_names(items_collection, "Item")
+    await items_collection.create_index("name", unique=True)
+    await items_collection.create_indexes([IndexModel(keys) for keys in [*ITEM_INDEXES, *SEARCH_INDEXES]])
 
     m_count = await monsters_collection.count_documents({})
     if m_count == 0:
@@ -66,20 +105,110 @@ async def lifespan(app: FastAPI):
         ]
         await monsters_collection.insert_many(monsters_seed_data)
         print("Successfully seeded 5 monsters!")
+        modified += len(monsters_seed_data)
     await monsters_collection.create_index([("name", "text"), ("desc", "text")])
+    modified += await ensure_unique_names(monsters_collection, "Monster")
+    await monsters_collection.create_index("name", unique=True)
+    await monsters_collection.create_indexes([IndexModel(keys) for keys in [*MONSTER_INDEXES, *SEARCH_INDEXES]])
+
+    # Renaming duplicates clears their search words, so the backfills run after both collections are deduplicated
+    modified += await backfill_numeric_fields(items_collection, monsters_collection)
+    modified += await backfill_versions(items_collection, monsters_collection)
+    await item_vocabulary.create_indexes()
+    await monster_vocabulary.create_indexes()
+    modified += await backfill_search_words(items_collection, item_vocabulary)
+    modified += await backfill_search_words(monsters_collection, monster_vocabulary)
+    # Seeding, migrations and a new release can all change responses, so old ETags and synced copies are not reused.
+    # Monster responses embed items, so both collections are reset together.
+    await change_log.create_indexes()
+    await change_log.reset_on_change("items", modified > 0, app.version)
+    await change_log.reset_on_change("monsters", modified > 0, app.version)
 
     yield
 
+    await event_hub.close()
+
 version = "1.0.0"
 app = FastAPI(lifespan=lifespan, version=version)
+http_metrics = HttpMetrics()
+app.add_middleware(MetricsMiddleware, metrics=http_metrics)
 
 load_dotenv()
 MONGO_URL = os.getenv("MONGODB_URL")
-client = AsyncMongoClient(MONGO_URL)
-db = client.get_database("dnd_database")
-
-items_collection = db.get_collection("items")
-monsters_collection = db.get_collection("monsters")
+mongo_metrics = MongoMetrics()
+pool_metrics = PoolMetrics()
+client = AsyncMongoClient(MONGO_URL, event_listeners=[mongo_metrics, pool_metrics], **client_options())
+db = client.get_database(os.getenv("MONGODB_DATABASE", "dnd_database"))
+# Same rule as write_concern(), for a w=0 given in the connection string
+if not db.write_concern.acknowledged:
+    raise ValueError("MONGODB_URL asks for unacknowledged writes (w=0), the routes need w=1 or more")
+
+items_collection = db.get_collection("items", write_concern=write_concern("MONGO_WRITE_CONCERN"))
+monsters_collection = db.get_collection("monsters", write_concern=write_concern("MONGO_WRITE_CONCERN"))
+# Read routes may be served by secondaries (MONGO_READ_PREFERENCE). Version and reference checks and the change log
+# stay on the primary, they must see the latest write. The ETag versions are read like the data, and before it,
+# so a lagging secondary can't pair a new ETag with an old body. Detail reads of documents this worker wrote in the
+# last PRIMARY_AFTER_WRITE_SECONDS go to the primary, so the writer reads its write and the cache doesn't keep
+# the old copy. Writes from other workers can still reach the cache late, for up to DOC_CACHE_TTL.
+READS_ON_PRIMARY = read_preference().mode == read_preferences.Primary().mode
+PRIMARY_AFTER_WRITE_SECONDS = 0 if READS_ON_PRIMARY else float(os.getenv("PRIMARY_AFTER_WRITE_SECONDS", "10"))
+items_reader = items_collection.with_options(read_preference=read_preference())
+monsters_reader = monsters_collection.with_options(read_preference=read_preference())
+# Bulk routes have their own write concern (MONGO_BULK_WRITE_CONCERN), e.g. w=1 for large imports
+items_bulk = items_collection.with_options(write_concern=write_concern("MONGO_BULK_WRITE_CONCERN"))
+monsters_bulk = monsters_collection.with_options(write_concern=write_concern("MONGO_BULK_WRITE_CONCERN"))
+versions_collection = db.get_collection("versions")
+versions_reader = versions_collection.with_options(read_preference=read_preference())
+changes_collection = db.get_collection("changes")
+
+CHANGE_LOG_RETENTION = int(os.getenv("CHANGE_LOG_RETENTION", str(7 * 24 * 3600)))
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1"))
+# How long a worker trusts its copy of the collection versions behind the ETags. With reads on the primary its own
+# writes update the copy immediately, so this only bounds how long another worker's write can go unnoticed
+# (0 reads every time). With reads on secondaries its own writes drop the copy instead.
+ETAG_VERSION_TTL = float(os.getenv("ETAG_VERSION_TTL", "1"))
+version_cache = VersionCache(versions_reader, ETAG_VERSION_TTL, follow_writes=READS_ON_PRIMARY)
+change_log = ChangeLog(changes_collection, versions_collection, CHANGE_LOG_RETENTION, version_cache)
+item_vocabulary = SearchVocabulary(db.get_collection("items_search_words"))
+monster_vocabulary = SearchVocabulary(db.get_collection("monsters_search_words"))
+event_hub = EventHub(db, ("items", "monsters"), changes_collection, versions_collection, EVENTS_POLL_INTERVAL)
+
+# Monster responses can embed items (expand=held_item), so their ETag also follows the items version
+items_etag = collection_etag(version_cache, "items")
+monsters_etag = collection_etag(version_cache, "monsters", "items")
+items_page_etag = collection_etag(version_cache, "items", negotiated=True)
+monsters_page_etag = collection_etag(version_cache, "monsters", "items", negotiated=True)
+
+# DOC_CACHE_SIZE=0 turns the read-through cache off
+DOC_CACHE_SIZE = int(os.getenv("DOC_CACHE_SIZE", "10000"))
+DOC_CACHE_TTL = float(os.getenv("DOC_CACHE_TTL", "60"))
+item_cache = DocumentCache(DOC_CACHE_SIZE, DOC_CACHE_TTL, PRIMARY_AFTER_WRITE_SECONDS)
+monster_cache = DocumentCache(DOC_CACHE_SIZE, DOC_CACHE_TTL, PRIMARY_AFTER_WRITE_SECONDS)
+
+# FAST_RESPONSES=1 renders list and search pages without re-validating the stored documents
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "0") == "1"
+
+
+def cache_stat(name: str):
+    caches = {"items": item_cache, "monsters": monster_cache}
+    return lambda: {(label,): cache.stats()[name] for label, cache in caches.items()}
+
+
+cache_metrics = [
+    Counter("document_cache_hits_total", "Reads served from the document cache.", ("collection",), cache_stat("hits")),
+    Counter("document_cache_misses_total", "Reads that went to MongoDB.", ("collection",), cache_stat("misses")),
+    Counter("document_cache_evictions_total", "Entries dropped to stay under the size limit.", ("collection",),
+            cache_stat("evictions")),
+    Gauge("document_cache_size", "Documents currently cached.", ("collection",), cache_stat("size")),
+]
+pool_size_metrics = [
+    Gauge("mongo_pool_max_size", "maxPoolSize of every server pool.", (), lambda: {(): pool_options().max_pool_size}),
+    Gauge("mongo_pool_min_size", "minPoolSize of every server pool.", (), lambda: {(): pool_options().min_pool_size}),
+]
+
+
+def pool_options():
+    return client.options.pool_options
 
 
 @app.get("/status")
@@ -87,61 +216,225 @@ def get_status():
     return {"status": "Online", "version": version}
 
 
-@app.get("/items", response_model=List[ItemModel], tags=["Items"])
-async def get_all_items(limit: int = 100):
-    return await items_collection.find().to_list(limit)
+@app.get("/events", tags=["Events"])
+async def get_events():
+    return StreamingResponse(
+        event_hub.stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/changes", response_model=ChangesPage, tags=["Events"])
+async def get_changes(
+    collection: Literal["items", "monsters"], since: int = Query(0, ge=0),
+    limit: int = Query(MAX_PAGE_SIZE, ge=0, le=MAX_PAGE_SIZE)
+):
+    return await change_log.changes_since(collection, since, limit)
+
+
+@app.get("/status/cache")
+def get_cache_status():
+    return {"items": item_cache.stats(), "monsters": monster_cache.stats()}
+
+
+@app.get("/status/pool")
+def get_pool_status():
+    return {
+        "max_pool_size": pool_options().max_pool_size,
+        "min_pool_size": pool_options().min_pool_size,
+        "servers": pool_metrics.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    metrics = [*http_metrics.metrics, *mongo_metrics.metrics, *pool_metrics.metrics, *pool_size_metrics, *cache_metrics]
+    body = render_metrics(metrics)
+    return Response(body, media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@app.get("/items", response_model=ItemPage, tags=["Items"], dependencies=[Depends(items_page_etag)])
+async def get_all_items(
+    request: Request, response: Response, filters: Annotated[ItemFilters, Depends()],
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+    fields: Optional[str] = None, sort: Optional[str] = None
+):
+    selected = parse_fields(fields, ItemModel)
+    raw = wants_bson(request)
+    page = await paginate(
+        raw_collection(items_reader) if raw else items_reader, item_query(filters), limit, cursor,
+        projection=to_projection(selected), sort=parse_sort(sort, ITEM_SORT_FIELDS)
+    )
+    if raw:
+        return render_bson(page, headers=response.headers)
+    if FAST_RESPONSES:
+        return render_fast(ItemModel, selected, page, paged=True, headers=response.headers)
+    if selected:
+        return render_fields(ItemModel, selected, page, paged=True, headers=response.headers)
+    return page
+
+
+@app.get("/export/items", tags=["Items"])
+async def export_items(request: Request, batch_size: int = Query(1000, ge=1, le=10000)):
+    if wants_bson(request):
+        stream, media_type = stream_bson(items_reader, batch_size), BSON_MEDIA_TYPE
+    else:
+        stream, media_type = stream_ndjson(items_reader, batch_size), NDJSON_MEDIA_TYPE
+    # The format follows the Accept header, so shared caches must keep both
+    return StreamingResponse(stream, media_type=media_type, headers={"Vary": "Accept"})
 
 
 @app.get("/items/{item_id}", response_model=ItemModel, tags=["Items"])
-async def get_item(item_id: str):
+async def get_item(item_id: str, request: Request, response: Response):
     try:
         obj_id = ObjectId(item_id)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
-    item = await items_collection.find_one({"_id": obj_id})
+    item = item_cache.get(obj_id) if item_cache.enabled else None
+    if item is None:
+        generation = item_cache.generation()
+        reader = items_collection if item_cache.written_recently(obj_id) else items_reader
+        item = await reader.find_one({"_id": obj_id}, SEARCH_EXCLUSION)
+        if item:
+            item_cache.set(obj_id, item, generation)
     if item:
+        document_etag(request, response, item)
         return item
     raise HTTPException(status_code=404, detail="Item not found")
 
 
-@app.get("/search/items", response_model=List[ItemModel], tags=["Items"])
-async def search_items(query: str, limit: int = 100):
-    return await items_collection.find({"$text": {"$search": query}}).to_list(limit)
+@app.get(
+    "/search/items", response_model=List[ItemSearchHit], tags=["Items"], dependencies=[Depends(items_etag)]
+)
+async def search_items(
+    query: str, response: Response, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), fields: Optional[str] = None,
+    mode: SearchMode = "text"
+):
+    selected = parse_fields(fields, ItemModel)
+    projection = to_projection(selected)
+    if mode == "fuzzy":
+        items = await fuzzy_search(item_vocabulary, items_reader, query, limit, projection)
+    else:
+        items = await text_search(items_reader, query, limit, projection)
+    if FAST_RESPONSES:
+        return render_fast(ItemSearchHit, hit_fields(selected), items, headers=response.headers)
+    if selected:
+        return render_fields(ItemSearchHit, hit_fields(selected), items, headers=response.headers)
+    return items
 
 
 @app.post("/items", response_model=ItemModel, status_code=201, tags=["Items"])
-async def create_item(item: ItemModel):
-    item_dict = item.model_dump(by_alias=True, exclude={"id"})
+async def create_item(
+    item: ItemModel, response: Response, return_mode: ReturnMode = Query("representation", alias="return")
+):
+    item_dict = {**item.model_dump(by_alias=True, exclude={"id"}), "version": 0}
+    item_dict[SEARCH_FIELD] = search_words(item_dict)
 
-    existing = await items_collection.find_one({"name": item.name})
-    if existing:
+    await item_vocabulary.add([item_dict])
+    try:
+        result = await items_collection.insert_one(item_dict)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Item already exists")
+    item_cache.invalidate(result.inserted_id)
+    await change_log.record("items", "insert", result.inserted_id, item_dict)
+
+    location = f"/items/{result.inserted_id}"
+    if return_mode == "minimal":
+        return JSONResponse({"_id": str(result.inserted_id)}, status_code=201, headers={"Location": location})
+
+    response.headers["Location"] = location
+    return {**item_dict, "_id": result.inserted_id}
+
+
+@app.post("/items/bulk", response_model=BulkReport, tags=["Items"])
+async def bulk_create_items(request: Request):
+    records = parse_records(await request.body(), request.headers.get("content-type", ""))
+    docs, results = validate_records(records, ItemModel)
+
+    for _, doc in docs:
+        doc[SEARCH_FIELD] = search_words(doc)
+    await item_vocabulary.add(doc for _, doc in docs)
+    await insert_chunks(items_bulk, docs, results, "Item")
+    inserted = written_docs(docs, results)
+    for doc in inserted:
+        item_cache.invalidate(doc["_id"])
+    await change_log.record_many("items", [("insert", doc["_id"], doc) for doc in inserted])
+    return bulk_report(results)
+
+
+# Registered before /items/{item_id} so "bulk" is not taken for an id
+@app.patch("/items/bulk", response_model=BulkUpdateReport, tags=["Items"])
+async def bulk_update_items(request: Request):
+    records = parse_records(await request.body(), request.headers.get("content-type", ""))
+    docs, results = validate_updates(records, ItemUpdate)
+    docs = await filter_missing_docs(items_collection, docs, results, "Item")
+    for _, doc in docs:
+        doc.update(search_updates(doc))
+    await item_vocabulary.add(doc for _, doc in docs)
 
-    result = await items_collection.insert_one(item_dict)
+    await write_chunks(items_bulk, docs, results, "Item", update_operation, "updated")
+    updated = written_docs(docs, results)
+    for doc in updated:
+        item_cache.invalidate(doc["_id"])
+    await change_log.record_many("items", [("update", doc["_id"], update_fields(doc)) for doc in updated])
+    return bulk_report(results, "updated")
 
-    new_item = await items_collection.find_one({"_id": result.inserted_id})
-    return new_item
+
+@app.delete("/items/bulk", response_model=BulkDeleteReport, tags=["Items"])
+async def bulk_delete_items(request: BulkDeleteRequest):
+    docs, results = parse_ids(request.ids)
+    docs = await filter_missing_docs(items_collection, docs, results, "Item")
+
+    await write_chunks(items_bulk, docs, results, "Item", delete_operation, "deleted")
+    deleted = written_docs(docs, results)
+    for doc in deleted:
+        item_cache.invalidate(doc["_id"])
+    await change_log.record_many("items", [("delete", doc["_id"], None) for doc in deleted])
+    return bulk_report(results, "deleted")
+
+
+@app.post("/items/batch-get", response_model=ItemBatchReport, tags=["Items"])
+async def batch_get_items(request: BatchGetRequest):
+    return await batch_get(items_reader, request.ids, "Item", cache=item_cache, primary=items_collection)
 
 
 @app.put("/items/{item_id}", response_model=ItemModel, tags=["Items"])
-async def update_item(item_id: str, item_data: ItemModel):
+async def update_item(item_id: str, item_data: ItemModel, if_match: Optional[str] = Header(None)):
     try:
         obj_id = ObjectId(item_id)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
-    update_data = item_data.model_dump(by_alias=True, exclude={"id"})
+    update_data = item_data.model_dump(by_alias=True, exclude={"id", "version"})
+    update_data[SEARCH_FIELD] = search_words(update_data)
+    await item_vocabulary.add([update_data])
 
-    result = await items_collection.find_one_and_update(
-        {"_id": obj_id},
-        {"$set": update_data},
-        return_document=True
-    )
+    result = await update_versioned(items_collection, obj_id, update_data, expected_version(if_match), "Item")
+    item_cache.invalidate(obj_id)
+    await change_log.record("items", "update", obj_id, update_data)
+    return result
 
-    if result:
-        return result
-    raise HTTPException(status_code=404, detail="Item not found")
+
+@app.patch("/items/{item_id}", response_model=ItemModel, tags=["Items"])
+async def patch_item(item_id: str, item_data: ItemUpdate, if_match: Optional[str] = Header(None)):
+    try:
+        obj_id = ObjectId(item_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    update_data = item_data.to_update()
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    update_data.update(search_updates(update_data))
+    await item_vocabulary.add([update_data])
+
+    expected = expected_version(if_match, item_data.version)
+    result = await update_versioned(items_collection, obj_id, update_data, expected, "Item")
+    item_cache.invalidate(obj_id)
+    await change_log.record("items", "update", obj_id, update_data)
+    return result
 
 
 @app.delete("/items/{item_id}", tags=["Items"])
@@ -152,43 +445,103 @@ async def delete_item(item_id: str):
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
     delete_result = await items_collection.delete_one({"_id": obj_id})
+    item_cache.invalidate(obj_id)
 
     if delete_result.deleted_count == 1:
+        await change_log.record("items", "delete", obj_id)
         return {"message": "Item successfully deleted"}
 
     raise HTTPException(status_code=404, detail="Item not found")
 
 
-@app.get("/monsters", response_model=List[MonsterModel], tags=["Monsters"])
-async def get_all_monsters(limit: int = 100):
-    return await monsters_collection.find().to_list(limit)
-
-
-@app.get("/monsters/{monster_id}", response_model=MonsterModel, tags=["Monsters"])
-async def get_monster(monster_id: str):
+@app.get("/monsters", response_model=MonsterPage, tags=["Monsters"], dependencies=[Depends(monsters_page_etag)])
+async def get_all_monsters(
+    request: Request, response: Response, filters: Annotated[MonsterFilters, Depends()],
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+    expand: Optional[Expand] = None, fields: Optional[str] = None, sort: Optional[str] = None
+):
+    selected = expand_fields(parse_fields(fields, ExpandedMonsterModel), expand)
+    raw = wants_bson(request)
+    page = await paginate(
+        raw_collection(monsters_reader) if raw else monsters_reader, monster_query(filters), limit, cursor,
+        expand_stages(expand), projection=to_projection(selected), sort=parse_sort(sort, MONSTER_SORT_FIELDS)
+    )
+    if raw:
+        return render_bson(page, headers=response.headers)
+    if FAST_RESPONSES:
+        return render_fast(ExpandedMonsterModel, selected, page, paged=True, headers=response.headers)
+    if selected:
+        return render_fields(ExpandedMonsterModel, selected, page, paged=True, headers=response.headers)
+    return page
+
+
+@app.get("/export/monsters", tags=["Monsters"])
+async def export_monsters(request: Request, batch_size: int = Query(1000, ge=1, le=10000)):
+    if wants_bson(request):
+        stream, media_type = stream_bson(monsters_reader, batch_size), BSON_MEDIA_TYPE
+    else:
+        stream, media_type = stream_ndjson(monsters_reader, batch_size), NDJSON_MEDIA_TYPE
+    # The format follows the Accept header, so shared caches must keep both
+    return StreamingResponse(stream, media_type=media_type, headers={"Vary": "Accept"})
+
+
+@app.get(
+    "/monsters/{monster_id}", response_model=ExpandedMonsterModel, tags=["Monsters"]
+)
+async def get_monster(monster_id: str, request: Request, response: Response, expand: Optional[Expand] = None):
     try:
         obj_id = ObjectId(monster_id)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
-    monster = await monsters_collection.find_one({"_id": obj_id})
+    reader = monsters_collection if monster_cache.written_recently(obj_id) else monsters_reader
+    if expand:
+        pipeline = [{"$match": {"_id": obj_id}}, {"$project": SEARCH_EXCLUSION}, *expand_stages(expand)]
+        monsters = await (await reader.aggregate(pipeline)).to_list(1)
+        monster = monsters[0] if monsters else None
+    else:
+        monster = monster_cache.get(obj_id) if monster_cache.enabled else None
+        if monster is None:
+            generation = monster_cache.generation()
+            monster = await reader.find_one({"_id": obj_id}, SEARCH_EXCLUSION)
+            if monster:
+                monster_cache.set(obj_id, monster, generation)
     if monster:
+        document_etag(request, response, monster, "held_item" if expand else None)
         return monster
     raise HTTPException(status_code=404, detail="Monster not found")
 
 
-@app.get("/search/monsters", response_model=List[MonsterModel], tags=["Monsters"])
-async def search_monsters(query: str, limit: int = 100):
-    return await monsters_collection.find({"$text": {"$search": query}}).to_list(limit)
+@app.get(
+    "/search/monsters", response_model=List[MonsterSearchHit], tags=["Monsters"],
+    dependencies=[Depends(monsters_etag)]
+)
+async def search_monsters(
+    query: str, response: Response, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    expand: Optional[Expand] = None, fields: Optional[str] = None, mode: SearchMode = "text"
+):
+    selected = expand_fields(parse_fields(fields, ExpandedMonsterModel), expand)
+    projection = to_projection(selected)
+    stages = expand_stages(expand)
 
+    if mode == "fuzzy":
+        monsters = await fuzzy_search(monster_vocabulary, monsters_reader, query, limit, projection, stages)
+    else:
+        monsters = await text_search(monsters_reader, query, limit, projection, stages)
 
-@app.post("/monsters", response_model=MonsterModel, status_code=201, tags=["Monsters"])
-async def create_monster(monster: MonsterModel):
-    monster_dict = monster.model_dump(by_alias=True, exclude={"id"})
+    if FAST_RESPONSES:
+        return render_fast(MonsterSearchHit, hit_fields(selected), monsters, headers=response.headers)
+    if selected:
+        return render_fields(MonsterSearchHit, hit_fields(selected), monsters, headers=response.headers)
+    return monsters
 
-    existing = await monsters_collection.find_one({"name": monster.name})
-    if existing:
-        raise HTTPException(status_code=400, detail="Monster already exists")
+
+@app.post("/monsters", response_model=MonsterModel, status_code=201, tags=["Monsters"])
+async def create_monster(
+    monster: MonsterModel, response: Response, return_mode: ReturnMode = Query("representation", alias="return")
+):
+    monster_dict = {**monster.model_dump(by_alias=True, exclude={"id"}), "version": 0}
+    monster_dict[SEARCH_FIELD] = search_words(monster_dict)
 
     if monster.held_item_id:
         try:
@@ -199,14 +552,80 @@ async def create_monster(monster: MonsterModel):
         if not item_exists:
             raise HTTPException(status_code=400, detail="The specified held_item_id does not exist")
 
-    result = await monsters_collection.insert_one(monster_dict)
-
-    new_monster = await monsters_collection.find_one({"_id": result.inserted_id})
-    return new_monster
+    await monster_vocabulary.add([monster_dict])
+    try:
+        result = await monsters_collection.insert_one(monster_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Monster already exists")
+    monster_cache.invalidate(result.inserted_id)
+    await change_log.record("monsters", "insert", result.inserted_id, monster_dict)
+
+    location = f"/monsters/{result.inserted_id}"
+    if return_mode == "minimal":
+        return JSONResponse({"_id": str(result.inserted_id)}, status_code=201, headers={"Location": location})
+
+    response.headers["Location"] = location
+    return {**monster_dict, "_id": result.inserted_id}
+
+
+@app.post("/monsters/bulk", response_model=BulkReport, tags=["Monsters"])
+async def bulk_create_monsters(request: Request):
+    records = parse_records(await request.body(), request.headers.get("content-type", ""))
+    docs, results = validate_records(records, MonsterModel)
+
+    docs = await filter_missing_held_items(items_collection, docs, results)
+    for _, doc in docs:
+        doc[SEARCH_FIELD] = search_words(doc)
+    await monster_vocabulary.add(doc for _, doc in docs)
+    await insert_chunks(monsters_bulk, docs, results, "Monster")
+    inserted = written_docs(docs, results)
+    for doc in inserted:
+        monster_cache.invalidate(doc["_id"])
+    await change_log.record_many("monsters", [("insert", doc["_id"], doc) for doc in inserted])
+    return bulk_report(results)
+
+
+@app.patch("/monsters/bulk", response_model=BulkUpdateReport, tags=["Monsters"])
+async def bulk_update_monsters(request: Request):
+    records = parse_records(await request.body(), request.headers.get("content-type", ""))
+    docs, results = validate_updates(records, MonsterUpdate)
+    docs = await filter_missing_held_items(items_collection, docs, results)
+    docs = await filter_missing_docs(monsters_collection, docs, results, "Monster")
+    for _, doc in docs:
+        doc.update(search_updates(doc))
+    await monster_vocabulary.add(doc for _, doc in docs)
+
+    await write_chunks(monsters_bulk, docs, results, "Monster", update_operation, "updated")
+    updated = written_docs(docs, results)
+    for doc in updated:
+        monster_cache.invalidate(doc["_id"])
+    await change_log.record_many("monsters", [("update", doc["_id"], update_fields(doc)) for doc in updated])
+    return bulk_report(results, "updated")
+
+
+@app.delete("/monsters/bulk", response_model=BulkDeleteReport, tags=["Monsters"])
+async def bulk_delete_monsters(request: BulkDeleteRequest):
+    docs, results = parse_ids(request.ids)
+    docs = await filter_missing_docs(monsters_collection, docs, results, "Monster")
+
+    await write_chunks(monsters_bulk, docs, results, "Monster", delete_operation, "deleted")
+    deleted = written_docs(docs, results)
+    for doc in deleted:
+        monster_cache.invalidate(doc["_id"])
+    await change_log.record_many("monsters", [("delete", doc["_id"], None) for doc in deleted])
+    return bulk_report(results, "deleted")
+
+
+@app.post("/monsters/batch-get", response_model=MonsterBatchReport, tags=["Monsters"])
+async def batch_get_monsters(request: BatchGetRequest, expand: Optional[Expand] = None):
+    return await batch_get(
+        monsters_reader, request.ids, "Monster", cache=monster_cache, stages=expand_stages(expand),
+        primary=monsters_collection
+    )
 
 
 @app.put("/monsters/{monster_id}", response_model=MonsterModel, tags=["Monsters"])
-async def update_monster(monster_id: str, monster_data: MonsterModel):
+async def update_monster(monster_id: str, monster_data: MonsterModel, if_match: Optional[str] = Header(None)):
     try:
         obj_id = ObjectId(monster_id)
     except InvalidId:
@@ -220,24 +639,55 @@ async def update_monster(monster_id: str, monster_data: MonsterModel):
         except InvalidId:
             raise HTTPException(status_code=400, detail="Invalid held_item_id format")
 
-    update_data = monster_data.model_dump(by_alias=True, exclude={"id"})
+    update_data = monster_data.model_dump(by_alias=True, exclude={"id", "version"})
+    update_data[SEARCH_FIELD] = search_words(update_data)
+    await monster_vocabulary.add([update_data])
 
-    result = await monsters_collection.find_one_and_update(
-        {"_id": obj_id},
-        {"$set": update_data},
-        return_document=True
+    result = await update_versioned(
+        monsters_collection, obj_id, update_data, expected_version(if_match), "Monster"
     )
+    monster_cache.invalidate(obj_id)
+    await change_log.record("monsters", "update", obj_id, update_data)
+    return result
 
-    if result:
-        return result
-    raise HTTPException(status_code=404, detail="Monster not found")
+
+@app.patch("/monsters/{monster_id}", response_model=MonsterModel, tags=["Monsters"])
+async def patch_monster(monster_id: str, monster_data: MonsterUpdate, if_match: Optional[str] = Header(None)):
+    try:
+        obj_id = ObjectId(monster_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    update_data = monster_data.to_update()
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    if update_data.get("held_item_id"):
+        try:
+            item_exists = await items_collection.find_one({"_id": ObjectId(update_data["held_item_id"])})
+            if not item_exists:
+                raise HTTPException(status_code=400, detail="The specified held_item_id does not exist")
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid held_item_id format")
+
+    update_data.update(search_updates(update_data))
+    await monster_vocabulary.add([update_data])
+
+    expected = expected_version(if_match, monster_data.version)
+    result = await update_versioned(monsters_collection, obj_id, update_data, expected, "Monster")
+    monster_cache.invalidate(obj_id)
+    await change_log.record("monsters", "update", obj_id, update_data)
+    return result
 
 
 @app.delete("/monsters/{monster_id}", tags=["Monsters"])
 async def delete_monster(monster_id: str):
-    delete_result = await monsters_collection.delete_one({"_id": ObjectId(monster_id)})
+    obj_id = ObjectId(monster_id)
+    delete_result = await monsters_collection.delete_one({"_id": obj_id})
+    monster_cache.invalidate(obj_id)
 
     if delete_result.deleted_count == 1:
+        await change_log.record("monsters", "delete", obj_id)
         return {"message": "Monster successfully deleted"}
 
     raise HTTPException(status_code=404, detail="Monster not found")
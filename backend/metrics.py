@@ -0,0 +1,307 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG_CHARS = 500
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Mongo time spent on behalf of the request being handled, pymongo runs the listener in the request's task
+request_timing = ContextVar("request_timing", default=None)
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), collect=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        # collect() returns {label values: value} for numbers that are tracked elsewhere, e.g. cache stats
+        self.collect = collect
+        self.values = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        values = self.collect() if self.collect else self.values
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts, sum, count], made cumulative only when rendered
+        self.series = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                bound_label = f'le="{bound}"'
+                yield f"{self.name}_bucket{format_labels(self.labels, labels, bound_label)} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, labels)} {total}"
+            yield f"{self.name}_count{format_labels(self.labels, labels)} {count}"
+
+
+def render_metrics(metrics: list) -> str:
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+class RequestTiming:
+    def __init__(self):
+        self.mongo_seconds = 0.0
+        self.mongo_commands = 0
+
+
+class HttpMetrics:
+    def __init__(self):
+        self.duration = Histogram(
+            "http_request_duration_seconds", "Time from request start to the last body chunk.",
+            ("method", "route", "status")
+        )
+        self.mongo_duration = Histogram(
+            "http_request_mongo_seconds", "Part of the request time spent waiting on MongoDB.", ("method", "route")
+        )
+        self.request_size = Histogram(
+            "http_request_size_bytes", "Request body size.", ("method", "route"), SIZE_BUCKETS
+        )
+        self.response_size = Histogram(
+            "http_response_size_bytes", "Response body size.", ("method", "route"), SIZE_BUCKETS
+        )
+        self.in_flight = Gauge(
+            "http_requests_in_flight", "Requests currently being handled, open event streams included."
+        )
+        self.metrics = [self.duration, self.mongo_duration, self.request_size, self.response_size, self.in_flight]
+
+
+# Plain ASGI middleware, so streamed responses (export, events) pass through without being buffered.
+# Requests are labelled by route template, not by raw path, to keep the number of series bounded.
+class MetricsMiddleware:
+    def __init__(self, app, metrics: HttpMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timing = RequestTiming()
+        token = request_timing.set(timing)
+        sizes = {"request": 0, "response": 0}
+        status = [500]
+
+        async def receive_counted():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                # Known once the handler has produced the response, so it shows up in browser dev tools too
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                mongo_ms = timing.mongo_seconds * 1000
+                server_timing = f"mongo;dur={mongo_ms:.1f}, app;dur={elapsed_ms - mongo_ms:.1f}"
+                message["headers"] = [*message.get("headers", []), (b"server-timing", server_timing.encode())]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.in_flight.inc()
+        try:
+            await self.app(scope, receive_counted, send_timed)
+        finally:
+            self.metrics.in_flight.dec()
+            request_timing.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route else "unmatched")
+            self.metrics.duration.observe((*labels, status[0]), time.perf_counter() - started)
+            self.metrics.mongo_duration.observe(labels, timing.mongo_seconds)
+            self.metrics.request_size.observe(labels, sizes["request"])
+            self.metrics.response_size.observe(labels, sizes["response"])
+
+
+def command_collection(event) -> str:
+    target = event.command.get(event.command_name)
+    if event.command_name == "getMore":
+        return event.command.get("collection", "")
+    return target if isinstance(target, str) else ""
+
+
+class MongoMetrics(monitoring.CommandListener):
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.in_progress = {}
+        self.duration = Histogram(
+            "mongo_command_duration_seconds", "MongoDB command round trip time.", ("collection", "command")
+        )
+        self.failures = Counter(
+            "mongo_command_failures_total", "Failed MongoDB commands.", ("collection", "command")
+        )
+        self.slow = Counter(
+            "mongo_slow_commands_total", f"Commands slower than {slow_query_ms:g} ms.", ("collection", "command")
+        )
+        self.metrics = [self.duration, self.failures, self.slow]
+
+    def key(self, event):
+        return event.connection_id, event.request_id
+
+    def started(self, event):
+        self.in_progress[self.key(event)] = (command_collection(event), event.command)
+
+    def finish(self, event) -> tuple:
+        collection, command = self.in_progress.pop(self.key(event), ("", None))
+        labels = (collection, event.command_name)
+        seconds = event.duration_micros / 1e6
+        self.duration.observe(labels, seconds)
+
+        timing = request_timing.get()
+        if timing is not None:
+            timing.mongo_seconds += seconds
+            timing.mongo_commands += 1
+
+        if seconds * 1000 >= self.slow_query_ms:
+            self.slow.inc(labels)
+            text = json.dumps(command, default=str) if command is not None else ""
+            print(f"Slow query: {event.command_name} on {collection or '-'} took {seconds * 1000:.1f} ms "
+                  f"{text[:SLOW_QUERY_LOG_CHARS]}")
+        return labels
+
+    def succeeded(self, event):
+        self.finish(event)
+
+    def failed(self, event):
+        self.failures.inc(self.finish(event))
+
+
+def format_address(address) -> str:
+    host, port = address
+    return f"{host}:{port}"
+
+
+# The driver has no public pool counters, so they are rebuilt from the connection pool events
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        labels = ("address",)
+        self.connections = Gauge("mongo_pool_connections", "Open connections, idle and in use.", labels)
+        self.checked_out = Gauge("mongo_pool_checked_out", "Connections currently in use.", labels)
+        self.waiting = Gauge("mongo_pool_waiting", "Operations waiting for a connection.", labels)
+        self.created = Counter("mongo_pool_connections_created_total", "Connections opened.", labels)
+        self.closed = Counter("mongo_pool_connections_closed_total", "Connections closed.", ("address", "reason"))
+        self.cleared = Counter("mongo_pool_cleared_total", "Times the pool was cleared after an error.", labels)
+        self.checkout_failures = Counter(
+            "mongo_pool_checkout_failures_total", "Failed connection checkouts.", ("address", "reason")
+        )
+        self.checkout_wait = Histogram(
+            "mongo_pool_checkout_seconds", "Time to get a connection, including opening a new one.", labels
+        )
+        self.metrics = [
+            self.connections, self.checked_out, self.waiting, self.created, self.closed, self.cleared,
+            self.checkout_failures, self.checkout_wait,
+        ]
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.cleared.inc((format_address(event.address),))
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        address = (format_address(event.address),)
+        self.created.inc(address)
+        self.connections.inc(address)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        address = format_address(event.address)
+        self.closed.inc((address, event.reason))
+        self.connections.dec((address,))
+
+    def connection_check_out_started(self, event):
+        self.waiting.inc((format_address(event.address),))
+
+    def connection_check_out_failed(self, event):
+        address = format_address(event.address)
+        self.waiting.dec((address,))
+        self.checkout_failures.inc((address, event.reason))
+
+    def connection_checked_out(self, event):
+        address = (format_address(event.address),)
+        self.waiting.dec(address)
+        self.checked_out.inc(address)
+        if event.duration is not None:
+            self.checkout_wait.observe(address, event.duration)
+
+    def connection_checked_in(self, event):
+        self.checked_out.dec((format_address(event.address),))
+
+    def stats(self) -> dict:
+        stats = {}
+        for name, metric in (
+            ("connections", self.connections), ("checked_out", self.checked_out), ("waiting", self.waiting),
+            ("created", self.created)
+        ):
+            for (address,), value in metric.values.items():
+                stats.setdefault(address, {})[name] = value
+        for (address, _), value in self.checkout_failures.values.items():
+            server = stats.setdefault(address, {})
+            server["checkout_failures"] = server.get("checkout_failures", 0) + value
+        for (address,), (_, total, count) in self.checkout_wait.series.items():
+            stats.setdefault(address, {})["checkout_seconds_avg"] = round(total / count, 6) if count else None
+        return stats
@@ -0,0 +1,117 @@
+import os
+from pymongo import UpdateOne
+
+from models import parse_challenge, parse_value_cp
+from search import SEARCH_FIELD, search_words
+
+MIGRATION_BATCH_SIZE = 1000
+
+
+# Each backfill returns how many documents it changed
+async def backfill(collection, target: str, source: str, parse) -> int:
+    batch, updated = [], 0
+    async for doc in collection.find({target: {"$exists": False}}, {source: 1}):
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {target: parse(str(doc.get(source, "")))}}))
+        if len(batch) >= MIGRATION_BATCH_SIZE:
+            await collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+
+    if updated:
+        print(f"Backfilled {target} on {updated} documents")
+    return updated
+
+
+# Documents written before versioning start at version 0
+async def backfill_versions(*collections) -> int:
+    updated = 0
+    for collection in collections:
+        result = await collection.update_many({"version": {"$exists": False}}, {"$set": {"version": 0}})
+        if result.modified_count:
+            print(f"Backfilled version on {result.modified_count} documents")
+        updated += result.modified_count
+    return updated
+
+
+# Documents written before the numeric shadow fields existed (including the seed data) get them here
+async def backfill_numeric_fields(items_collection, monsters_collection) -> int:
+    return (
+        await backfill(items_collection, "value_cp", "value", parse_value_cp)
+        + await backfill(monsters_collection, "challenge_num", "challenge", parse_challenge)
+    )
+
+
+# Search words for documents written before fuzzy search stored them (the seed data included).
+# An empty vocabulary, e.g. a new database with old documents, is rebuilt from every document.
+async def backfill_search_words(collection, vocabulary) -> int:
+    rebuild = await vocabulary.is_empty()
+    batch, updated = [], 0
+
+    async def flush():
+        await vocabulary.add([{SEARCH_FIELD: words} for _, words in batch])
+        await collection.bulk_write(
+            [UpdateOne({"_id": obj_id}, {"$set": {SEARCH_FIELD: words}}) for obj_id, words in batch], ordered=False
+        )
+
+    async for doc in collection.find({SEARCH_FIELD: {"$exists": False}}, {"name": 1, "desc": 1}):
+        batch.append((doc["_id"], search_words(doc)))
+        if len(batch) >= MIGRATION_BATCH_SIZE:
+            await flush()
+            updated += len(batch)
+            batch = []
+    if batch:
+        await flush()
+        updated += len(batch)
+
+    if updated:
+        print(f"Backfilled {SEARCH_FIELD} on {updated} documents")
+    if rebuild:
+        await vocabulary.rebuild(collection)
+    return updated
+
+
+async def free_name(collection, name: str, suffix: int) -> tuple:
+    while await collection.count_documents({"name": f"{name} ({suffix})"}, limit=1):
+        suffix += 1
+    return f"{name} ({suffix})", suffix + 1
+
+
+# create_index("name", unique=True) fails on data written before the index existed. Startup stops with the
+# duplicates listed instead, or with DEDUPE_NAMES=1 the oldest copy keeps its name and the others are
+# renamed to "<name> (2)", "<name> (3)", ... so nothing is lost and references by id keep working.
+# Returns how many documents were renamed.
+async def ensure_unique_names(collection, label: str) -> int:
+    indexes = await collection.index_information()
+    if any(info.get("unique") and info["key"] == [("name", 1)] for info in indexes.values()):
+        return 0
+
+    cursor = await collection.aggregate([
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": "$name", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+    duplicates = await cursor.to_list(None)
+    if not duplicates:
+        return 0
+
+    if os.getenv("DEDUPE_NAMES") != "1":
+        listed = "; ".join(f"{group['_id']!r}: {', '.join(map(str, group['ids']))}" for group in duplicates)
+        raise RuntimeError(
+            f"Cannot enforce unique {label} names, {len(duplicates)} names are used more than once ({listed}). "
+            "Rename or delete the extra copies, or start once with DEDUPE_NAMES=1 to rename them automatically."
+        )
+
+    renamed = 0
+    for group in duplicates:
+        suffix = 2
+        for obj_id in group["ids"][1:]:
+            name, suffix = await free_name(collection, group["_id"], suffix)
+            await collection.update_one(
+                {"_id": obj_id}, {"$set": {"name": name}, "$unset": {SEARCH_FIELD: ""}, "$inc": {"version": 1}}
+            )
+            renamed += 1
+    print(f"Renamed {renamed} {label.lower()}s with duplicate names")
+    return renamed
@@ -1,7 +1,38 @@
-from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
-from typing import Annotated, Optional
+import re
+from fractions import Fraction
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, ValidationInfo, field_validator, model_validator
+from typing import Annotated, ClassVar, Dict, List, Literal, Optional
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
+ReturnMode = Literal["representation", "minimal"]
+Expand = Literal["held_item"]
+SearchMode = Literal["text", "fuzzy"]
+
+COIN_VALUES_CP = {"cp": 1, "sp": 10, "ep": 50, "gp": 100, "pp": 1000}
+VALUE_PATTERN = re.compile(r"^\s*(\d[\d,]*(?:\.\d+)?)\s*(cp|sp|ep|gp|pp)\.?\s*$", re.IGNORECASE)
+
+
+# Largest integer BSON can store, bigger values can't be written at all
+MAX_INT64 = 2 ** 63 - 1
+
+
+# "1/4" -> 0.25, "6" -> 6.0, None when it isn't a number a double can hold (e.g. "1e400")
+def parse_challenge(challenge: str) -> Optional[float]:
+    try:
+        return float(Fraction(challenge.strip()))
+    except (ValueError, ZeroDivisionError, OverflowError):
+        return None
+
+
+# "1,500 gp" -> 150000, None when it doesn't fit in an int64
+def parse_value_cp(value: str) -> Optional[int]:
+    match = VALUE_PATTERN.match(value)
+    if not match:
+        return None
+    amount, coin = match.groups()
+    # Exact, float() would turn a long run of digits into inf
+    value_cp = round(Fraction(amount.replace(",", "")) * COIN_VALUES_CP[coin.lower()])
+    return value_cp if value_cp <= MAX_INT64 else None
 
 
 class ItemModel(BaseModel):
@@ -11,9 +42,18 @@ class ItemModel(BaseModel):
     value: str
     rarity: str
     desc: str
+    # Derived from value so price can be range-queried and sorted in Mongo
+    value_cp: Optional[int] = None
+    # Bumped by the server on every write, used for optimistic concurrency
+    version: int = 0
 
     model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
 
+    @model_validator(mode="after")
+    def derive_value_cp(self):
+        self.value_cp = parse_value_cp(self.value)
+        return self
+
 
 class MonsterModel(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
@@ -30,5 +70,207 @@ class MonsterModel(BaseModel):
     charisma: int
     held_item_id: Optional[PyObjectId] = Field(default=None)
     desc: str
+    # Derived from challenge so CR can be range-queried and sorted in Mongo
+    challenge_num: Optional[float] = None
+    # Bumped by the server on every write, used for optimistic concurrency
+    version: int = 0
 
     model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
+
+    @model_validator(mode="after")
+    def derive_challenge_num(self):
+        self.challenge_num = parse_challenge(self.challenge)
+        return self
+
+
+# Partial updates: every field is optional and only the ones that were sent are written.
+# version is the version the client last read, not a value to store.
+class PartialUpdate(BaseModel):
+    # source field -> (derived shadow field, parser), recomputed when the source is updated
+    derived: ClassVar[dict] = {}
+    nullable: ClassVar[tuple] = ()
+
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True, extra="forbid")
+
+    version: Optional[int] = None
+
+    @field_validator("*")
+    @classmethod
+    def reject_null(cls, value, info: ValidationInfo):
+        if value is None and info.field_name not in (*cls.nullable, "id", "version"):
+            raise ValueError("cannot be null")
+        return value
+
+    def to_update(self) -> dict:
+        fields = self.model_dump(by_alias=True, exclude={"id", "version"}, exclude_unset=True)
+        for source, (target, parse) in self.derived.items():
+            if source in fields:
+                fields[target] = parse(fields[source])
+        return fields
+
+
+class ItemUpdate(PartialUpdate):
+    derived: ClassVar[dict] = {"value": ("value_cp", parse_value_cp)}
+
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    name: Optional[str] = None
+    weight: Optional[float] = None
+    value: Optional[str] = None
+    rarity: Optional[str] = None
+    desc: Optional[str] = None
+
+
+class MonsterUpdate(PartialUpdate):
+    derived: ClassVar[dict] = {"challenge": ("challenge_num", parse_challenge)}
+    nullable: ClassVar[tuple] = ("held_item_id",)
+
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    name: Optional[str] = None
+    ac: Optional[int] = None
+    hp: Optional[int] = None
+    speed: Optional[str] = None
+    challenge: Optional[str] = None
+    strength: Optional[int] = None
+    dexterity: Optional[int] = None
+    constitution: Optional[int] = None
+    intelligence: Optional[int] = None
+    wisdom: Optional[int] = None
+    charisma: Optional[int] = None
+    held_item_id: Optional[PyObjectId] = None
+    desc: Optional[str] = None
+
+
+class ExpandedMonsterModel(MonsterModel):
+    held_item: Optional[ItemModel] = Field(default=None, exclude_if=lambda value: value is None)
+
+
+class SearchHit(BaseModel):
+    score: Optional[float] = Field(default=None, exclude_if=lambda value: value is None)
+    # field -> text with the matched parts wrapped in <mark>, only from fuzzy search
+    highlights: Optional[Dict[str, str]] = Field(default=None, exclude_if=lambda value: value is None)
+
+
+class ItemSearchHit(ItemModel, SearchHit):
+    pass
+
+
+class MonsterSearchHit(ExpandedMonsterModel, SearchHit):
+    pass
+
+
+class ItemPage(BaseModel):
+    data: List[ItemModel]
+    next: Optional[str] = None
+
+
+class MonsterPage(BaseModel):
+    data: List[ExpandedMonsterModel]
+    next: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkReport(BaseModel):
+    inserted: int
+    failed: int
+    results: List[BulkResult]
+
+
+class BulkUpdateReport(BaseModel):
+    updated: int
+    failed: int
+    results: List[BulkResult]
+
+
+class BulkDeleteReport(BaseModel):
+    deleted: int
+    failed: int
+    results: List[BulkResult]
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+
+
+class BatchGetRequest(BaseModel):
+    ids: List[str]
+
+
+class ItemBatchResult(BaseModel):
+    index: int
+    id: str
+    status: str
+    error: Optional[str] = None
+    data: Optional[ItemModel] = None
+
+
+class MonsterBatchResult(BaseModel):
+    index: int
+    id: str
+    status: str
+    error: Optional[str] = None
+    data: Optional[ExpandedMonsterModel] = None
+
+
+class ItemBatchReport(BaseModel):
+    found: int
+    failed: int
+    results: List[ItemBatchResult]
+
+
+class MonsterBatchReport(BaseModel):
+    found: int
+    failed: int
+    results: List[MonsterBatchResult]
+
+
+class ChangeEntry(BaseModel):
+    version: int
+    op: str
+    id: Optional[PyObjectId] = None
+    fields: Optional[dict] = None
+
+
+class ChangesPage(BaseModel):
+    collection: str
+    version: int
+    latest: int
+    reset: bool
+    more: bool
+    changes: List[ChangeEntry]
+
+
+class ItemFilters(BaseModel):
+    rarity: Optional[str] = None
+    weight_min: Optional[float] = None
+    weight_max: Optional[float] = None
+    value_cp_min: Optional[int] = None
+    value_cp_max: Optional[int] = None
+
+
+class MonsterFilters(BaseModel):
+    challenge: Optional[str] = None
+    speed: Optional[str] = None
+    challenge_num_min: Optional[float] = None
+    challenge_num_max: Optional[float] = None
+    ac_min: Optional[int] = None
+    ac_max: Optional[int] = None
+    hp_min: Optional[int] = None
+    hp_max: Optional[int] = None
+    strength_min: Optional[int] = None
+    strength_max: Optional[int] = None
+    dexterity_min: Optional[int] = None
+    dexterity_max: Optional[int] = None
+    constitution_min: Optional[int] = None
+    constitution_max: Optional[int] = None
+    intelligence_min: Optional[int] = None
+    intelligence_max: Optional[int] = None
+    wisdom_min: Optional[int] = None
+    wisdom_max: Optional[int] = None
+    charisma_min: Optional[int] = None
+    charisma_max: Optional[int] = None
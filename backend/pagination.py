@@ -0,0 +1,95 @@
+import base64
+import binascii
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from typing import Optional
+
+MAX_PAGE_SIZE = 500
+DEFAULT_SORT = ("_id", 1)
+
+
+def parse_sort(sort: Optional[str], allowed: tuple) -> tuple:
+    if not sort:
+        return DEFAULT_SORT
+
+    direction = -1 if sort.startswith("-") else 1
+    field = sort.lstrip("+-")
+    if field not in allowed:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by {field}, allowed: {', '.join(allowed)}")
+    return field, direction
+
+
+# Cursors carry the last sort value and _id, so the next page can resume from the same index position
+def encode_cursor(last_doc: dict, sort: tuple) -> str:
+    field, _ = sort
+    if field == "_id":
+        raw = last_doc["_id"].binary
+    else:
+        raw = json.dumps([field, last_doc.get(field), str(last_doc["_id"])]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: tuple) -> dict:
+    field, direction = sort
+    op = "$gt" if direction == 1 else "$lt"
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        if field == "_id":
+            return {"_id": {op: ObjectId(raw)}}
+
+        decoded = json.loads(raw)
+        if not isinstance(decoded, list):
+            raise ValueError("Cursor is not a list")
+        cursor_field, value, last_id = decoded
+        if cursor_field != field:
+            raise ValueError("Cursor was issued for a different sort")
+        # Only values encode_cursor can produce, a dict here would be read as query operators
+        if value is not None and not isinstance(value, (str, int, float)):
+            raise ValueError("Cursor holds an unsupported sort value")
+        last_id = ObjectId(last_id)
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Missing values sort before everything else and cannot be compared with $gt/$lt
+    if value is None:
+        if direction == 1:
+            return {"$or": [{field: {"$ne": None}}, {field: None, "_id": {op: last_id}}]}
+        return {field: None, "_id": {op: last_id}}
+
+    position = [{field: {op: value}}, {field: value, "_id": {op: last_id}}]
+    if direction == -1:
+        position.append({field: None})
+    return {"$or": position}
+
+
+# Keyset pagination on (sort field, _id) - every page is a range scan on the matching index.
+# Extra aggregation stages (e.g. $lookup) run after the limit, so they only touch the page itself.
+async def paginate(
+    collection, query: dict, limit: int, cursor: Optional[str] = None,
+    stages: Optional[list] = None, projection: Optional[dict] = None, sort: tuple = DEFAULT_SORT
+):
+    if cursor:
+        position = decode_cursor(cursor, sort)
+        query = {"$and": [query, position]} if query else position
+
+    field, direction = sort
+    sort_spec = [("_id", direction)] if field == "_id" else [(field, direction), ("_id", direction)]
+    # The cursor needs the sort field, an exclusion projection keeps it anyway
+    if projection and any(projection.values()):
+        projection = {**projection, field: 1}
+
+    if stages:
+        pipeline = [{"$match": query}, {"$sort": dict(sort_spec)}, {"$limit": limit + 1}]
+        if projection:
+            pipeline.append({"$project": projection})
+        docs = await (await collection.aggregate([*pipeline, *stages])).to_list(limit + 1)
+    else:
+        docs = await collection.find(query, projection).sort(sort_spec).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort)
+    return {"data": docs, "next": next_cursor}
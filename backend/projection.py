@@ -0,0 +1,102 @@
+from fastapi import HTTPException, Response
+from functools import lru_cache
+from pydantic import BaseModel, TypeAdapter, create_model
+from typing import List, Optional, Union, get_args, get_origin
+
+from export import dump_json
+from search import SEARCH_EXCLUSION
+
+
+def parse_fields(fields: Optional[str], model) -> Optional[tuple]:
+    if not fields:
+        return None
+
+    names = {name.strip() for name in fields.split(",") if name.strip()} - {"_id", "id"}
+    unknown = sorted(name for name in names if name not in model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(sorted(names))
+
+
+def to_projection(selected: Optional[tuple]) -> dict:
+    if selected is None:
+        return SEARCH_EXCLUSION
+    return {name: 1 for name in selected}
+
+
+# Trimmed models are built once per (model, fields) combination and reused
+@lru_cache(maxsize=128)
+def fields_adapter(model, selected: tuple, paged: bool) -> TypeAdapter:
+    trimmed = create_model(
+        f"{model.__name__}Fields",
+        __config__=model.model_config,
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in ("id", *selected)}
+    )
+    if paged:
+        page = create_model(f"{model.__name__}FieldsPage", data=(List[trimmed], ...), next=(Optional[str], None))
+        return TypeAdapter(page)
+    return TypeAdapter(List[trimmed])
+
+
+def render_fields(model, selected: tuple, data, paged: bool = False, headers=None) -> Response:
+    adapter = fields_adapter(model, selected, paged)
+    body = adapter.dump_json(adapter.validate_python(data), by_alias=True)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def to_float(value):
+    return float(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+
+def to_int(value):
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+# What a field's value needs to encode the way the model would: numbers stored as the other numeric type
+# are converted, embedded models are shaped like top-level documents. None when it can pass through as is.
+def field_converter(annotation):
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    if annotation is float:
+        return to_float
+    if annotation is int:
+        return to_int
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        shape = fast_shape(annotation, None)
+        return lambda value: shape(value) if isinstance(value, dict) else value
+    return None
+
+
+# Fast path for documents read straight from Mongo: they were validated when written, so instead of
+# re-validating every field they are only trimmed to the model's fields, with defaults for missing ones,
+# and encoded in one pass. ObjectIds are converted by the encoder, nested ones included.
+@lru_cache(maxsize=128)
+def fast_shape(model, selected: Optional[tuple]):
+    names = ("id", *selected) if selected is not None else tuple(model.model_fields)
+    layout = []
+    for name in names:
+        field = model.model_fields[name]
+        default = None if field.is_required() else field.default
+        layout.append((field.alias or name, default, field.exclude_if is not None, field_converter(field.annotation)))
+
+    def shape(doc: dict) -> dict:
+        shaped = {}
+        for key, default, omit_none, convert in layout:
+            value = doc.get(key, default)
+            if value is None:
+                if omit_none:
+                    continue
+            elif convert is not None:
+                value = convert(value)
+            shaped[key] = value
+        return shaped
+    return shape
+
+
+def render_fast(model, selected: Optional[tuple], data, paged: bool = False, headers=None) -> Response:
+    shape = fast_shape(model, selected)
+    if paged:
+        body = {"data": [shape(doc) for doc in data["data"]], "next": data["next"]}
+    else:
+        body = [shape(doc) for doc in data]
+    return Response(dump_json(body), media_type="application/json", headers=headers)
@@ -0,0 +1,290 @@
+import asyncio
+import html
+import math
+import re
+from collections import defaultdict
+from pymongo.errors import BulkWriteError
+from typing import Optional
+
+# Matches in the name count twice as much as matches in the description
+FIELD_WEIGHTS = {"name": 2.0, "desc": 1.0}
+# Minimum trigram similarity (Dice coefficient) for a word to count as a typo of the query term
+FUZZY_THRESHOLD = 0.4
+# Fuzzy matches rank below exact and prefix matches of the same word
+FUZZY_FACTOR = 0.8
+WORD_PATTERN = re.compile(r"\w+")
+# Typo matching only for terms this long, shorter ones are matched as exact words and prefixes
+FUZZY_MIN_LENGTH = 3
+# Typos are looked for among words at most this many characters longer or shorter than the term
+FUZZY_LENGTH_DELTA = 2
+# Vocabulary words read per term: prefix completions scanned, fuzzy candidates scanned, and matches kept
+PREFIX_SCAN_LIMIT = 200
+FUZZY_SCAN_LIMIT = 200
+TERM_WORD_LIMIT = 50
+MAX_QUERY_TERMS = 8
+# Documents read per field (name, desc) for ranking
+CANDIDATE_LIMIT = 1000
+VOCABULARY_BATCH_SIZE = 5000
+DUPLICATE_KEY = 11000
+
+# Search tokens are stored with the documents and indexed, but never returned
+SEARCH_FIELD = "search_words"
+SEARCH_EXCLUSION = {SEARCH_FIELD: 0}
+SEARCH_INDEXES = [[(f"{SEARCH_FIELD}.{field}", 1)] for field in FIELD_WEIGHTS]
+
+
+def tokenize(text: str) -> list:
+    return WORD_PATTERN.findall(text.casefold())
+
+
+def trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# True for projections that list the fields to keep, as opposed to the ones to drop
+def includes(projection: dict) -> bool:
+    return any(value for value in projection.values())
+
+
+def hit_fields(selected: Optional[tuple]) -> Optional[tuple]:
+    if selected is None:
+        return None
+    return tuple(sorted({*selected, "score", "highlights"}))
+
+
+def highlight(text: str, marks: dict) -> Optional[str]:
+    parts, last, marked = [], 0, False
+    for match in WORD_PATTERN.finditer(text):
+        length = marks.get(match.group().casefold())
+        if not length:
+            continue
+        start, end = match.start(), match.start() + min(length, len(match.group()))
+        parts.append(html.escape(text[last:start]))
+        parts.append(f"<mark>{html.escape(text[start:end])}</mark>")
+        last, marked = end, True
+    if not marked:
+        return None
+    parts.append(html.escape(text[last:]))
+    return "".join(parts)
+
+
+# Fuzzy search keeps its tokens in Mongo. Every document stores the distinct words of its name and desc
+# (multikey indexed), and each collection has a vocabulary of the words in use with their trigrams. A query
+# term is matched against the vocabulary (exact, prefix or typo), the matched words select candidate
+# documents through the index, and only those candidates are ranked here.
+class SearchVocabulary:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def create_indexes(self):
+        await self.collection.create_index([("length", 1), ("grams", 1)])
+
+    # Called before the documents are written, so a stored word is always in the vocabulary. Words are
+    # never removed, a word no document uses any more just matches nothing.
+    async def add(self, docs):
+        words = set()
+        for doc in docs:
+            words.update(written_words(doc))
+        await self.add_words(words)
+
+    async def add_words(self, words):
+        words = sorted(words)
+        for start in range(0, len(words), VOCABULARY_BATCH_SIZE):
+            batch = words[start:start + VOCABULARY_BATCH_SIZE]
+            known = {doc["_id"] async for doc in self.collection.find({"_id": {"$in": batch}}, {"_id": 1})}
+            new = [vocabulary_entry(word) for word in batch if word not in known]
+            if not new:
+                continue
+            try:
+                await self.collection.insert_many(new, ordered=False)
+            except BulkWriteError as e:
+                # Another process added some of the same words first
+                if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                    raise
+
+    async def is_empty(self) -> bool:
+        return not await self.collection.count_documents({}, limit=1)
+
+    # word -> (similarity, number of leading characters to highlight)
+    async def match(self, term: str) -> dict:
+        prefix_cursor = self.collection.find({"_id": {"$gte": term, "$lt": term + "\uffff"}}, {"_id": 1})
+        prefixed = [doc["_id"] async for doc in prefix_cursor.limit(PREFIX_SCAN_LIMIT)]
+
+        matches = {}
+        # Shorter completions are closer to what is being typed
+        for word in sorted(prefixed, key=len)[:TERM_WORD_LIMIT]:
+            if word == term:
+                matches[word] = (1.0, len(word))
+            else:
+                matches[word] = (0.5 + 0.5 * len(term) / len(word), len(term))
+
+        if len(term) < FUZZY_MIN_LENGTH:
+            return matches
+        term_grams = sorted(trigrams(term))
+        # Words within FUZZY_LENGTH_DELTA characters have about as many trigrams as the term, which gives
+        # a lower bound on the shared trigrams a word needs to reach FUZZY_THRESHOLD
+        min_shared = math.ceil(FUZZY_THRESHOLD * (len(term_grams) - FUZZY_LENGTH_DELTA / 2))
+        cursor = await self.collection.aggregate([
+            {"$match": {
+                "length": {"$gte": len(term) - FUZZY_LENGTH_DELTA, "$lte": len(term) + FUZZY_LENGTH_DELTA},
+                "grams": {"$in": term_grams},
+            }},
+            {"$project": {
+                "gram_count": 1, "shared": {"$size": {"$setIntersection": ["$grams", {"$literal": term_grams}]}}
+            }},
+            {"$match": {"shared": {"$gte": min_shared}}},
+            {"$sort": {"shared": -1}},
+            {"$limit": FUZZY_SCAN_LIMIT},
+        ])
+        similar = []
+        async for doc in cursor:
+            similarity = 2 * doc["shared"] / (len(term_grams) + doc["gram_count"])
+            if similarity >= FUZZY_THRESHOLD and doc["_id"] not in matches:
+                similar.append((similarity, doc["_id"]))
+        for similarity, word in sorted(similar, reverse=True)[:TERM_WORD_LIMIT]:
+            matches[word] = (FUZZY_FACTOR * similarity, len(word))
+        return matches
+
+    # Rebuilt from the stored words when the vocabulary collection is new or was dropped
+    async def rebuild(self, collection):
+        cursor = await collection.aggregate([
+            {"$project": {"words": {"$setUnion": [f"${SEARCH_FIELD}.{field}" for field in FIELD_WEIGHTS]}}},
+            {"$unwind": "$words"},
+            {"$group": {"_id": "$words"}},
+        ])
+        batch = []
+        async for doc in cursor:
+            batch.append(doc["_id"])
+            if len(batch) >= VOCABULARY_BATCH_SIZE:
+                await self.add_words(batch)
+                batch = []
+        if batch:
+            await self.add_words(batch)
+
+
+def vocabulary_entry(word: str) -> dict:
+    grams = sorted(trigrams(word))
+    return {"_id": word, "length": len(word), "grams": grams, "gram_count": len(grams)}
+
+
+def field_words(text) -> list:
+    return sorted(set(tokenize(str(text or ""))))
+
+
+# Stored form for inserts and full replacements
+def search_words(doc: dict) -> dict:
+    return {field: field_words(doc.get(field)) for field in FIELD_WEIGHTS}
+
+
+# $set form for partial updates, only the fields being written
+def search_updates(fields: dict) -> dict:
+    return {f"{SEARCH_FIELD}.{field}": field_words(fields[field]) for field in FIELD_WEIGHTS if field in fields}
+
+
+def is_search_key(key: str) -> bool:
+    return key == SEARCH_FIELD or key.startswith(f"{SEARCH_FIELD}.")
+
+
+# Words carried by a document or update in either form
+def written_words(doc: dict) -> set:
+    words = set()
+    for key, value in doc.items():
+        if key == SEARCH_FIELD:
+            words.update(*value.values())
+        elif is_search_key(key):
+            words.update(value)
+    return words
+
+
+# Candidates come from the name and desc indexes separately, so name matches (which weigh more) are not
+# crowded out by description matches when a common word hits more than CANDIDATE_LIMIT documents
+async def rank(collection, term_matches: list, limit: int) -> list:
+    words = sorted({word for matches in term_matches for word in matches})
+    if not words:
+        return []
+
+    async def field_hits(field: str) -> list:
+        path = f"{SEARCH_FIELD}.{field}"
+        cursor = await collection.aggregate([
+            {"$match": {path: {"$in": words}}},
+            {"$limit": CANDIDATE_LIMIT},
+            {"$project": {"words": {"$setIntersection": [f"${path}", {"$literal": words}]}}},
+        ])
+        return await cursor.to_list(None)
+
+    found = defaultdict(dict)
+    for field, hits in zip(FIELD_WEIGHTS, await asyncio.gather(*(field_hits(field) for field in FIELD_WEIGHTS))):
+        for hit in hits:
+            found[hit["_id"]][field] = set(hit["words"])
+
+    # Every term adds the score of its best matching word in the document
+    scores = {}
+    for doc_id, fields in found.items():
+        score = 0.0
+        for matches in term_matches:
+            score += max(
+                (similarity * FIELD_WEIGHTS[field] for field, present in fields.items()
+                 for word, (similarity, _) in matches.items() if word in present),
+                default=0.0
+            )
+        scores[doc_id] = score
+    return sorted(scores.items(), key=lambda hit: (-hit[1], str(hit[0])))[:limit]
+
+
+# $text search ranked by Mongo's own relevance score
+async def text_search(collection, query: str, limit: int, projection: Optional[dict] = None, stages=None) -> list:
+    score = {"score": {"$meta": "textScore"}}
+    match = {"$text": {"$search": query}}
+    if stages:
+        pipeline = [{"$match": match}, {"$sort": score}, {"$limit": limit}, {"$addFields": score}]
+        if projection:
+            pipeline.append({"$project": {**projection, "score": 1} if includes(projection) else projection})
+        return await (await collection.aggregate([*pipeline, *stages])).to_list(limit)
+
+    cursor = collection.find(match, {**(projection or {}), **score})
+    return await cursor.sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+
+
+# Ranks the candidates, then loads the hits with one $in query and puts them back in rank order
+async def fuzzy_search(
+    vocabulary: SearchVocabulary, collection, query: str, limit: int, projection: Optional[dict] = None,
+    stages=None
+) -> list:
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    term_matches = await asyncio.gather(*(vocabulary.match(term) for term in terms))
+    hits = await rank(collection, term_matches, limit)
+    if not hits:
+        return []
+
+    marks = {}
+    for matches in term_matches:
+        for word, (_, length) in matches.items():
+            marks[word] = max(marks.get(word, 0), length)
+
+    # Highlights need the text even when other fields were selected
+    if projection and includes(projection):
+        projection = {**projection, **{field: 1 for field in FIELD_WEIGHTS}}
+    match = {"_id": {"$in": [doc_id for doc_id, _ in hits]}}
+    if stages:
+        pipeline = [{"$match": match}]
+        if projection:
+            pipeline.append({"$project": projection})
+        docs = await (await collection.aggregate([*pipeline, *stages])).to_list(None)
+    else:
+        docs = await collection.find(match, projection).to_list(None)
+
+    by_id = {doc["_id"]: doc for doc in docs}
+    results = []
+    for doc_id, score in hits:
+        # A document deleted after it was ranked is simply left out
+        doc = by_id.get(doc_id)
+        if doc is None:
+            continue
+        highlights = {}
+        for field in FIELD_WEIGHTS:
+            marked = highlight(str(doc.get(field) or ""), marks)
+            if marked:
+                highlights[field] = marked
+        results.append({**doc, "score": round(score, 4), "highlights": highlights})
+    return results
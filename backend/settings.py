@@ -0,0 +1,77 @@
+import os
+from pymongo import read_preferences
+from pymongo.write_concern import WriteConcern
+
+# Environment variable -> (AsyncMongoClient option, parser). Unset variables keep the driver default
+# or whatever the connection string says (e.g. appName), set ones take precedence over the connection string.
+CLIENT_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", int),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", int),
+    "MONGO_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", int),
+    # Caps how many connections a pool opens at once, which is what turns a burst into a connection storm
+    "MONGO_MAX_CONNECTING": ("maxConnecting", int),
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": ("waitQueueTimeoutMS", int),
+    "MONGO_CONNECT_TIMEOUT_MS": ("connectTimeoutMS", int),
+    "MONGO_SOCKET_TIMEOUT_MS": ("socketTimeoutMS", int),
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": ("serverSelectionTimeoutMS", int),
+    "MONGO_TIMEOUT_MS": ("timeoutMS", int),
+    # e.g. "zstd,snappy,zlib", the server picks the first one it supports. zstd and snappy need extra
+    # packages (see the pymongo docs), the driver warns and skips them when they are missing.
+    "MONGO_COMPRESSORS": ("compressors", str),
+    "MONGO_ZLIB_COMPRESSION_LEVEL": ("zlibCompressionLevel", int),
+    "MONGO_APP_NAME": ("appname", str),
+}
+
+READ_PREFERENCES = {
+    "primary": read_preferences.Primary,
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
+
+
+def env_value(name: str, parse):
+    value = os.getenv(name)
+    if not value:
+        return None
+    try:
+        return parse(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid {name}={value!r}: {e}")
+
+
+def client_options() -> dict:
+    options = {}
+    for name, (option, parse) in CLIENT_OPTIONS.items():
+        value = env_value(name, parse)
+        if value is not None:
+            options[option] = value
+    return options
+
+
+# Used by the read routes only, see main.py for what stays on the primary
+def read_preference():
+    mode = os.getenv("MONGO_READ_PREFERENCE", "primary")
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"Invalid MONGO_READ_PREFERENCE={mode!r}, expected one of {', '.join(READ_PREFERENCES)}")
+    if mode == "primary":
+        return read_preferences.Primary()
+    max_staleness = env_value("MONGO_MAX_STALENESS_SECONDS", int)
+    return READ_PREFERENCES[mode](max_staleness=max_staleness if max_staleness is not None else -1)
+
+
+def parse_w(value: str):
+    return int(value) if value.isdigit() else value
+
+
+# One write concern per route class, e.g. MONGO_WRITE_CONCERN=majority for single-document writes and
+# MONGO_BULK_WRITE_CONCERN=1 for imports. None keeps the client's default. w=0 is refused: the routes report
+# per-record results from the server's reply (matched counts, duplicate keys), unacknowledged writes have none.
+def write_concern(name: str):
+    w = env_value(name, parse_w)
+    if w is None:
+        return None
+    if w == 0:
+        raise ValueError(f"Invalid {name}=0, the routes need acknowledged writes (w=1 or more)")
+    return WriteConcern(w=w, wtimeout=env_value("MONGO_WRITE_TIMEOUT_MS", int))
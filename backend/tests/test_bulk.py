@@ -0,0 +1,139 @@
+import asyncio
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from bulk import delete_operation, filter_missing_docs, looks_applied, update_operation, write_chunks
+
+
+# Just enough of a collection for the bulk helpers. `race` runs right before bulk_write applies anything,
+# standing in for another request that writes between the pre-check and the bulk write.
+class FakeCollection:
+    def __init__(self, docs: list, race=None):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs}
+        self.race = race
+        self.finds = 0
+
+    def find(self, query: dict, projection: dict):
+        self.finds += 1
+        wanted = query["_id"]["$in"]
+        found = [
+            {"_id": obj_id, **{key: doc[key] for key in projection if key in doc}}
+            for obj_id, doc in self.docs.items() if obj_id in wanted
+        ]
+
+        async def cursor():
+            for doc in found:
+                yield doc
+        return cursor()
+
+    def matches(self, query: dict):
+        doc = self.docs.get(query["_id"])
+        if doc is None or any(doc.get(key) != value for key, value in query.items()):
+            return None
+        return doc
+
+    async def bulk_write(self, operations: list, ordered: bool):
+        if self.race:
+            self.race(self.docs)
+            self.race = None
+        matched = deleted = 0
+        for operation in operations:
+            doc = self.matches(operation._filter)
+            if doc is None:
+                continue
+            if operation._doc is None:
+                del self.docs[doc["_id"]]
+                deleted += 1
+                continue
+            doc.update(operation._doc["$set"])
+            doc["version"] += operation._doc["$inc"]["version"]
+            matched += 1
+        return SimpleNamespace(matched_count=matched, deleted_count=deleted)
+
+
+def stored(name: str, version: int = 0) -> dict:
+    return {"_id": ObjectId(), "name": name, "weight": 1.0, "version": version}
+
+
+def run_updates(collection, records: list) -> list:
+    async def run():
+        results = []
+        docs = await filter_missing_docs(collection, list(enumerate(records)), results, "Item")
+        await write_chunks(collection, docs, results, "Item", update_operation, "updated")
+        return sorted(results, key=lambda result: result["index"])
+    return asyncio.run(run())
+
+
+def test_updates_without_a_race_skip_the_recheck():
+    rope, torch = stored("Rope"), stored("Torch", 3)
+    collection = FakeCollection([rope, torch])
+    results = run_updates(collection, [
+        {"_id": rope["_id"], "weight": 2.0, "version": 0}, {"_id": torch["_id"], "weight": 2.0},
+    ])
+    assert [result["status"] for result in results] == ["updated", "updated"]
+    assert collection.docs[torch["_id"]]["version"] == 4
+    assert collection.finds == 1
+
+
+def test_versioned_update_that_loses_the_race_is_a_conflict():
+    rope, torch = stored("Rope"), stored("Torch")
+
+    def race(docs):
+        docs[rope["_id"]].update(weight=5.0, version=1)
+
+    collection = FakeCollection([rope, torch], race)
+    results = run_updates(collection, [
+        {"_id": rope["_id"], "weight": 2.0, "version": 0}, {"_id": torch["_id"], "weight": 2.0, "version": 0},
+    ])
+    assert results[0] == {
+        "index": 0, "status": "error", "error": "Item was changed by someone else, reload it first"
+    }
+    assert results[1]["status"] == "updated"
+    assert collection.docs[rope["_id"]]["weight"] == 5.0
+
+
+def test_versioned_update_already_applied_by_the_racing_write_counts_as_updated():
+    rope = stored("Rope")
+
+    def race(docs):
+        docs[rope["_id"]].update(weight=2.0, version=1)
+
+    results = run_updates(FakeCollection([rope], race), [{"_id": rope["_id"], "weight": 2.0, "version": 0}])
+    assert results[0]["status"] == "updated"
+
+
+def test_update_of_a_document_deleted_during_the_write_is_not_found():
+    rope, torch = stored("Rope"), stored("Torch")
+
+    def race(docs):
+        del docs[rope["_id"]]
+
+    results = run_updates(FakeCollection([rope, torch], race), [
+        {"_id": rope["_id"], "weight": 2.0}, {"_id": torch["_id"], "weight": 2.0},
+    ])
+    assert results[0] == {"index": 0, "status": "error", "error": "Item not found"}
+    assert results[1]["status"] == "updated"
+
+
+def test_delete_racing_another_delete_is_reported_deleted():
+    rope = stored("Rope")
+
+    def race(docs):
+        del docs[rope["_id"]]
+
+    async def run():
+        results = []
+        docs = await filter_missing_docs(collection, [(0, {"_id": rope["_id"]})], results, "Item")
+        await write_chunks(collection, docs, results, "Item", delete_operation, "deleted")
+        return results
+
+    collection = FakeCollection([rope], race)
+    assert asyncio.run(run()) == [{"index": 0, "status": "deleted", "id": str(rope["_id"])}]
+
+
+def test_looks_applied():
+    update = {"_id": ObjectId(), "weight": 2.0, "search_words": {"name": ["rope"]}, "version": 0}
+    assert looks_applied(update, {"weight": 2.0, "version": 1})
+    assert not looks_applied(update, {"weight": 2.0, "version": 0})
+    assert not looks_applied(update, {"weight": 3.0, "version": 1})
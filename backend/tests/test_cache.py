@@ -0,0 +1,61 @@
+from cache import DocumentCache
+
+
+def test_read_started_before_an_invalidation_is_not_cached():
+    cache = DocumentCache(10, 60)
+    generation = cache.generation()
+    cache.invalidate("a")
+    cache.set("a", {"version": 0}, generation)
+    assert cache.get("a") is None
+
+    cache.set("a", {"version": 1}, cache.generation())
+    assert cache.get("a") == {"version": 1}
+
+
+def test_invalidating_another_key_does_not_block_a_read():
+    cache = DocumentCache(10, 60)
+    generation = cache.generation()
+    cache.invalidate("b")
+    cache.set("a", {"version": 0}, generation)
+    assert cache.get("a") == {"version": 0}
+
+
+def test_forgotten_generations_block_every_older_read():
+    cache = DocumentCache(2, 60)
+    generation = cache.generation()
+    for key in ("a", "b", "c"):
+        cache.invalidate(key)
+    assert "a" not in cache.generations
+    cache.set("a", {"version": 0}, generation)
+    cache.set("z", {"version": 0}, generation)
+    assert cache.get("a") is None
+    assert cache.get("z") is None
+
+
+def test_invalidate_drops_the_entry():
+    cache = DocumentCache(10, 60)
+    cache.set("a", {"version": 0})
+    cache.invalidate("a")
+    assert cache.get("a") is None
+
+
+def test_expired_and_evicted_entries_are_misses():
+    cache = DocumentCache(2, -1)
+    cache.set("a", {"version": 0})
+    assert cache.get("a") is None
+
+    cache = DocumentCache(2, 60)
+    for key in ("a", "b", "c"):
+        cache.set(key, {"version": 0})
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_stores_nothing_but_tracks_writes():
+    cache = DocumentCache(0, 60, primary_after_write=10)
+    cache.set("a", {"version": 0})
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.written_recently("a")
+    assert not cache.written_recently("b")
+    assert not DocumentCache(10, 60).written_recently("a")
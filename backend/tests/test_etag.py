@@ -0,0 +1,38 @@
+import pytest
+from fastapi import HTTPException, Response
+from starlette.requests import Request
+
+from etag import document_etag
+
+
+def request(if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def monster_etag(monster: dict) -> str:
+    return document_etag(request(), Response(), monster, "held_item")
+
+
+def test_detail_etag_is_the_version():
+    response = Response()
+    assert document_etag(request(), response, {"version": 3}) == '"3"'
+    assert response.headers["ETag"] == '"3"'
+    with pytest.raises(HTTPException) as e:
+        document_etag(request('"3"'), Response(), {"version": 3})
+    assert e.value.status_code == 304
+
+
+def test_expanded_etag_changes_when_the_held_item_goes_away():
+    held = {"held_item_id": "64b0c0ffee0000000000000a", "version": 2}
+    found = monster_etag({**held, "held_item": {"version": 0}})
+    deleted = monster_etag(held)
+    cleared = monster_etag({"version": 2})
+    assert found == 'W/"2.64b0c0ffee0000000000000a.0"'
+    assert len({found, deleted, cleared}) == 3
+
+
+def test_expanded_etag_changes_when_the_held_item_is_replaced():
+    first = monster_etag({"held_item_id": "64b0c0ffee0000000000000a", "held_item": {"version": 0}, "version": 2})
+    second = monster_etag({"held_item_id": "64b0c0ffee0000000000000b", "held_item": {"version": 0}, "version": 2})
+    assert first != second
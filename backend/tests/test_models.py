@@ -0,0 +1,48 @@
+import bson
+import pytest
+
+from bulk import validate_records
+from models import ItemModel, MonsterModel, parse_challenge, parse_value_cp
+
+MONSTER = {
+    "name": "Goblin", "ac": 15, "hp": 7, "speed": "30 ft.", "challenge": "1/4", "strength": 8, "dexterity": 14,
+    "constitution": 10, "intelligence": 10, "wisdom": 8, "charisma": 8, "desc": "A small humanoid.",
+}
+ITEM = {"name": "Rope", "weight": 10, "value": "1 gp", "rarity": "common", "desc": "50 feet of hempen rope."}
+
+
+@pytest.mark.parametrize("challenge, expected", [("1/4", 0.25), ("6", 6.0), (" 30 ", 30.0), ("1/0", None), ("?", None)])
+def test_parse_challenge(challenge, expected):
+    assert parse_challenge(challenge) == expected
+
+
+@pytest.mark.parametrize("challenge", ["1e400", "-1e400", "inf", "nan"])
+def test_parse_challenge_rejects_non_finite(challenge):
+    assert parse_challenge(challenge) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1,500 gp", 150000), ("2.5 sp", 25), ("3 PP.", 3000), ("9223372036854775807 cp", 2 ** 63 - 1), ("a lot", None),
+])
+def test_parse_value_cp(value, expected):
+    assert parse_value_cp(value) == expected
+
+
+@pytest.mark.parametrize("value", ["9223372036854775808 cp", "99999999999999999999 gp", "9" * 400 + " gp"])
+def test_parse_value_cp_rejects_values_outside_int64(value):
+    assert parse_value_cp(value) is None
+
+
+def test_out_of_range_documents_can_be_stored():
+    monster = MonsterModel.model_validate({**MONSTER, "challenge": "1e400"})
+    item = ItemModel.model_validate({**ITEM, "value": "99999999999999999999 gp"})
+    assert monster.challenge_num is None
+    assert item.value_cp is None
+    bson.encode(monster.model_dump(by_alias=True, exclude={"id"}))
+    bson.encode(item.model_dump(by_alias=True, exclude={"id"}))
+
+
+def test_bulk_validation_keeps_out_of_range_records():
+    docs, results = validate_records([{**MONSTER, "challenge": "1e400"}, MONSTER], MonsterModel)
+    assert results == []
+    assert [doc["challenge_num"] for _, doc in docs] == [None, 0.25]
@@ -0,0 +1,51 @@
+import base64
+import json
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor
+
+DOC = {"_id": ObjectId(), "name": "Rope", "weight": 10.0}
+
+
+def raw_cursor(value) -> str:
+    raw = value if isinstance(value, bytes) else json.dumps(value).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_id_cursor_round_trip():
+    assert decode_cursor(encode_cursor(DOC, ("_id", -1)), ("_id", -1)) == {"_id": {"$lt": DOC["_id"]}}
+
+
+def test_field_cursor_round_trip():
+    position = decode_cursor(encode_cursor(DOC, ("weight", 1)), ("weight", 1))
+    assert position == {"$or": [{"weight": {"$gt": 10.0}}, {"weight": 10.0, "_id": {"$gt": DOC["_id"]}}]}
+
+
+def test_cursor_from_another_sort_is_rejected():
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(encode_cursor(DOC, ("name", 1)), ("weight", 1))
+    assert e.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    raw_cursor(b"\xff\xfe"),
+    raw_cursor(b"short"),
+    raw_cursor(5),
+    raw_cursor("weight"),
+    raw_cursor(["weight", 10.0]),
+    raw_cursor(["weight", 10.0, str(DOC["_id"]), "extra"]),
+    raw_cursor({"weight": 1, "10": 2, str(DOC["_id"]): 3}),
+    raw_cursor(["weight", 10.0, 12345]),
+    raw_cursor(["weight", 10.0, "not an id"]),
+    raw_cursor(["weight", {"$ne": None}, str(DOC["_id"])]),
+    raw_cursor(["weight", [1, 2], str(DOC["_id"])]),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    for sort in (("_id", 1), ("weight", 1)):
+        with pytest.raises(HTTPException) as e:
+            decode_cursor(cursor, sort)
+        assert e.value.status_code == 400
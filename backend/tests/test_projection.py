@@ -0,0 +1,45 @@
+import json
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+from typing import List
+
+from models import ExpandedMonsterModel, ItemModel, MonsterPage, MonsterSearchHit
+from projection import render_fast
+
+ITEM_ID = ObjectId()
+HELD_ITEM = {
+    "_id": ITEM_ID, "name": "Rope", "weight": 3, "value": "1 gp", "rarity": "common", "desc": "Hempen.",
+    "value_cp": 100, "version": 2, "legacy_note": "not part of the model",
+}
+MONSTER = {
+    "_id": ObjectId(), "name": "Goblin", "ac": 15, "hp": 7.0, "speed": "30 ft.", "challenge": "1/4", "strength": 8,
+    "dexterity": 14, "constitution": 10, "intelligence": 10, "wisdom": 8, "charisma": 8, "held_item_id": ITEM_ID,
+    "desc": "A small humanoid.", "challenge_num": 0.25, "version": 1, "stray": True, "held_item": HELD_ITEM,
+}
+
+
+def model_json(model, data) -> list:
+    adapter = TypeAdapter(model)
+    return json.loads(adapter.dump_json(adapter.validate_python(data), by_alias=True))
+
+
+def test_fast_page_matches_model_for_expanded_monsters():
+    page = {"data": [MONSTER, {**MONSTER, "held_item": None, "held_item_id": None}], "next": "abc"}
+    fast = json.loads(render_fast(ExpandedMonsterModel, None, page, paged=True).body)
+    assert fast == model_json(MonsterPage, page)
+    # Equal as numbers either way, the JSON has to say 3.0 like the model does
+    assert isinstance(fast["data"][0]["held_item"]["weight"], float)
+    assert "legacy_note" not in fast["data"][0]["held_item"]
+
+
+def test_fast_search_hits_match_model():
+    hits = [{**MONSTER, "score": 2.5}]
+    assert json.loads(render_fast(MonsterSearchHit, None, hits).body) == model_json(List[MonsterSearchHit], hits)
+
+
+def test_fast_selected_fields_match_model():
+    items = [{"_id": ITEM_ID, "weight": 3}]
+    fast = json.loads(render_fast(ItemModel, ("weight",), items).body)
+    assert fast == [{"_id": str(ITEM_ID), "weight": 3.0}]
+    assert isinstance(fast[0]["weight"], float)
@@ -0,0 +1,25 @@
+import pytest
+
+from settings import client_options, write_concern
+
+
+def test_write_concern(monkeypatch):
+    monkeypatch.setenv("MONGO_BULK_WRITE_CONCERN", "majority")
+    assert write_concern("MONGO_BULK_WRITE_CONCERN").document == {"w": "majority"}
+    monkeypatch.setenv("MONGO_BULK_WRITE_CONCERN", "1")
+    assert write_concern("MONGO_BULK_WRITE_CONCERN").document == {"w": 1}
+    monkeypatch.delenv("MONGO_BULK_WRITE_CONCERN")
+    assert write_concern("MONGO_BULK_WRITE_CONCERN") is None
+
+
+def test_unacknowledged_write_concern_is_refused(monkeypatch):
+    monkeypatch.setenv("MONGO_BULK_WRITE_CONCERN", "0")
+    with pytest.raises(ValueError, match="MONGO_BULK_WRITE_CONCERN"):
+        write_concern("MONGO_BULK_WRITE_CONCERN")
+
+
+def test_app_name_only_when_set(monkeypatch):
+    monkeypatch.delenv("MONGO_APP_NAME", raising=False)
+    assert "appname" not in client_options()
+    monkeypatch.setenv("MONGO_APP_NAME", "dnd-backend")
+    assert client_options()["appname"] == "dnd-backend"
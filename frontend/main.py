@@ -1,39 +1,310 @@
+import json
+import os
 import sys
+import threading
 import httpx
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from collections import OrderedDict
+from urllib.parse import quote
+from PyQt6.QtCore import (
+    QAbstractListModel, QModelIndex, QObject, QRunnable, Qt, QThreadPool, QTimer, pyqtSignal
+)
 from PyQt6.QtWidgets import (
-    QApplication, QPushButton, QVBoxLayout, QWidget, QSplitter, QMainWindow, QListWidget, QLineEdit, QLabel,
+    QApplication, QPushButton, QVBoxLayout, QWidget, QSplitter, QMainWindow, QListView, QLineEdit, QLabel,
     QFormLayout, QGroupBox, QGridLayout, QDoubleSpinBox, QHBoxLayout, QFrame, QSpinBox, QComboBox, QMessageBox
 )
 
-
-class DataWorker(QThread):
+API_URL = "http://127.0.0.1:8000"
+ETAG_CACHE_SIZE = 256
+POOL_THREADS = 4
+MAX_CONNECTIONS = 8
+# The server is only asked once typing pauses for this long
+SEARCH_DEBOUNCE_MS = 250
+LIST_PAGE_SIZE = 200
+DETAIL_CACHE_SIZE = 64
+# Entry names and the change log version they reflect, so a restart only downloads what changed
+SYNC_STATE_PATH = os.path.join(os.path.expanduser("~"), ".dnd_sync_state.json")
+CATEGORIES = ("monster", "item")
+
+try:
+    import h2  # noqa: F401 - httpx only speaks HTTP/2 when it is installed
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+
+def load_sync_state():
+    try:
+        with open(SYNC_STATE_PATH, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # A copy synced against another server is useless here
+    if not isinstance(state, dict) or state.get("api_url") != API_URL:
+        return {}
+    return state
+
+
+def save_sync_state(state):
+    try:
+        with open(SYNC_STATE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"api_url": API_URL, **state}, f)
+    except OSError:
+        pass
+
+
+# A request as seen by one caller. Identical GETs share one ApiCall, cancelling a handle
+# only detaches that caller and the call itself is dropped once nobody is waiting for it.
+class ApiRequest(QObject):
     data_signal = pyqtSignal(object)
     error_signal = pyqtSignal(str)
 
-    def __init__(self, endpoint, method="GET", data=None):
+    def __init__(self, call):
         super().__init__()
+        self.call = call
+
+    def cancel(self):
+        self.call.detach(self)
+
+
+class ApiCall(QObject):
+    # Emitted from a pool thread, delivered on the GUI thread
+    done_signal = pyqtSignal(object, str)
+
+    def __init__(self, api, endpoint, method, data, headers=None):
+        super().__init__()
+        self.api = api
         self.endpoint = endpoint
         self.method = method
         self.data = data
+        self.headers = headers or {}
+        self.handles = []
+        self.cancelled = False
+        self.done_signal.connect(self.deliver)
+
+    def detach(self, handle):
+        if handle in self.handles:
+            self.handles.remove(handle)
+        if not self.handles and not self.cancelled:
+            # A call that has not started yet is skipped, a running one has its response discarded
+            self.cancelled = True
+            self.api.finish(self)
+
+    def deliver(self, data, error):
+        if self.cancelled:
+            return
+        self.api.finish(self)
+        for handle in self.handles:
+            if error:
+                handle.error_signal.emit(error)
+            else:
+                handle.data_signal.emit(data)
+
+
+class ApiTask(QRunnable):
+    def __init__(self, call):
+        super().__init__()
+        self.call = call
 
     def run(self):
+        if self.call.cancelled:
+            return
         try:
-            url = f"http://127.0.0.1:8000/{self.endpoint}"
-
-            with httpx.Client(timeout=5.0) as client:
-                if self.method == "GET":
-                    response = client.get(url)
-                elif self.method == "POST":
-                    response = client.post(url, json=self.data)
-                elif self.method == "PUT":
-                    response = client.put(url, json=self.data)
-                elif self.method == "DELETE":
-                    response = client.delete(url)
-            response.raise_for_status()
-            self.data_signal.emit(response.json())
+            data, error = self.call.api.send(self.call), ""
         except Exception as e:
-            self.error_signal.emit(str(e))
+            data, error = None, str(e)
+        self.call.done_signal.emit(data, error)
+
+
+# One pooled keep-alive connection set and a few threads shared by every request the window makes
+class ApiClient:
+    def __init__(self):
+        self.http = httpx.Client(
+            base_url=API_URL, timeout=5.0, http2=HTTP2,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        )
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(POOL_THREADS)
+        # Only touched from the GUI thread
+        self.in_flight = {}
+        self.keyed = {}
+        # endpoint -> (etag, parsed body) for conditional GETs, filled from the pool threads
+        self.etag_cache = {}
+        self.etag_lock = threading.Lock()
+
+    # A request with a key supersedes the previous unfinished request with the same key
+    def request(self, endpoint, method="GET", data=None, key=None, headers=None):
+        self.cancel(key)
+
+        call = self.in_flight.get(endpoint) if method == "GET" else None
+        if call is None:
+            call = ApiCall(self, endpoint, method, data, headers)
+            if method == "GET":
+                self.in_flight[endpoint] = call
+            self.pool.start(ApiTask(call))
+
+        handle = ApiRequest(call)
+        call.handles.append(handle)
+        if key is not None:
+            self.keyed[key] = handle
+        return handle
+
+    def cancel(self, key):
+        if key is not None and key in self.keyed:
+            self.keyed.pop(key).cancel()
+
+    def finish(self, call):
+        if self.in_flight.get(call.endpoint) is call:
+            del self.in_flight[call.endpoint]
+        for key, handle in list(self.keyed.items()):
+            if handle.call is call:
+                del self.keyed[key]
+
+    def send(self, call):
+        if call.method == "GET":
+            with self.etag_lock:
+                cached = self.etag_cache.get(call.endpoint)
+            headers = {"If-None-Match": cached[0]} if cached else {}
+            response = self.http.get(call.endpoint, headers=headers)
+            if response.status_code == 304 and cached:
+                return cached[1]
+        else:
+            response = self.http.request(call.method, call.endpoint, json=call.data, headers=call.headers)
+        response.raise_for_status()
+        data = response.json()
+
+        if call.method == "GET" and "ETag" in response.headers:
+            with self.etag_lock:
+                self.etag_cache[call.endpoint] = (response.headers["ETag"], data)
+                if len(self.etag_cache) > ETAG_CACHE_SIZE:
+                    self.etag_cache.pop(next(iter(self.etag_cache)))
+        return data
+
+    def close(self):
+        self.pool.clear()
+        self.pool.waitForDone()
+        self.http.close()
+
+
+# Holds only ids and names, the next page is requested when the view scrolls to the end.
+# While searching, a filtered list is shown in place of the loaded one.
+class EntryListModel(QAbstractListModel):
+    def __init__(self, category, fetch_page):
+        super().__init__()
+        self.category = category
+        self.fetch_page = fetch_page
+        self.ids = []
+        self.names = []
+        self.positions = {}
+        self.next_cursor = None
+        self.complete = False
+        self.loading = False
+        self.filtered = None
+        # Nothing is fetched until the sync has decided where the list starts
+        self.ready = False
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.filtered) if self.filtered is not None else len(self.ids)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if self.filtered is not None:
+            entry_id, name = self.filtered[index.row()]
+        else:
+            entry_id, name = self.ids[index.row()], self.names[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return name
+        if role == Qt.ItemDataRole.UserRole:
+            return entry_id
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.ready:
+            return False
+        return self.filtered is None and not self.complete and not self.loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.loading = True
+        self.fetch_page(self.category, self.next_cursor)
+
+    def load(self, entries, next_cursor=None, complete=False):
+        self.beginResetModel()
+        self.ids = [entry_id for entry_id, _ in entries]
+        self.names = [name for _, name in entries]
+        self.positions = {entry_id: position for position, entry_id in enumerate(self.ids)}
+        self.next_cursor = next_cursor
+        self.complete = complete
+        self.loading = False
+        self.filtered = None
+        self.ready = True
+        self.endResetModel()
+
+    def append_page(self, docs, next_cursor):
+        new = [(doc["_id"], doc.get("name", "")) for doc in docs if doc["_id"] not in self.positions]
+        if new:
+            if self.filtered is None:
+                self.beginInsertRows(QModelIndex(), len(self.ids), len(self.ids) + len(new) - 1)
+            for entry_id, name in new:
+                self.positions[entry_id] = len(self.ids)
+                self.ids.append(entry_id)
+                self.names.append(name)
+            if self.filtered is None:
+                self.endInsertRows()
+        self.next_cursor = next_cursor
+        self.complete = next_cursor is None
+        self.loading = False
+
+    def loaded_entries(self):
+        return list(zip(self.ids, self.names))
+
+    def name_of(self, entry_id):
+        position = self.positions.get(entry_id)
+        return self.names[position] if position is not None else None
+
+    def set_filter(self, entries):
+        self.beginResetModel()
+        self.filtered = entries
+        self.endResetModel()
+
+    # Rows past the loaded part are left alone, the page that contains them is fetched as it is
+    def apply_change(self, op, entry_id, fields=None):
+        name = fields.get("name") if fields else None
+        position = self.positions.get(entry_id)
+        filtered = self.filtered is not None
+
+        if op == "delete":
+            if position is not None:
+                if not filtered:
+                    self.beginRemoveRows(QModelIndex(), position, position)
+                del self.ids[position]
+                del self.names[position]
+                del self.positions[entry_id]
+                for later, later_id in enumerate(self.ids[position:], start=position):
+                    self.positions[later_id] = later
+                if not filtered:
+                    self.endRemoveRows()
+        elif position is not None:
+            if name is not None:
+                self.names[position] = name
+                if not filtered:
+                    self.dataChanged.emit(self.index(position), self.index(position))
+        elif self.complete and name is not None:
+            self.append_page([{"_id": entry_id, "name": name}], None)
+
+        if filtered:
+            for row, (filtered_id, _) in enumerate(self.filtered):
+                if filtered_id != entry_id:
+                    continue
+                if op == "delete":
+                    self.beginRemoveRows(QModelIndex(), row, row)
+                    del self.filtered[row]
+                    self.endRemoveRows()
+                elif name is not None:
+                    self.filtered[row] = (entry_id, name)
+                    self.dataChanged.emit(self.index(row), self.index(row))
+                break
 
 
 class MainWindow(QMainWindow):
@@ -57,7 +328,16 @@ class MainWindow(QMainWindow):
             "desc": "Description"
             }
 
-        self.all_data = {}
+        self.models = {category: EntryListModel(category, self.fetch_page) for category in CATEGORIES}
+        # (category, id) -> full document, most recently viewed last
+        self.detail_cache = OrderedDict()
+        # category -> change log version the loaded entries are up to date with
+        self.sync_versions = {}
+        self.pending_versions = {}
+        self.api = ApiClient()
+        # Bumped on every keystroke, a response is only shown if nothing was typed after it was requested
+        self.search_seq = {category: 0 for category in CATEGORIES}
+        self.search_timers = {}
 
         # Splitter - for side screen and main screen
         self.splitter = QSplitter(Qt.Orientation.Horizontal)
@@ -96,7 +376,20 @@ class MainWindow(QMainWindow):
         # Base size for panels
         self.splitter.setSizes([200, 600])
 
-        self.fetch_all_data()
+        self.sync_all()
+
+    def closeEvent(self, event):
+        save_sync_state({
+            category: {
+                "version": version,
+                "entries": self.models[category].loaded_entries(),
+                "next": self.models[category].next_cursor,
+                "complete": self.models[category].complete,
+            }
+            for category, version in self.sync_versions.items()
+        })
+        self.api.close()
+        super().closeEvent(event)
 
     # Setup the left panel
     def setup_left_panel(self):
@@ -112,9 +405,9 @@ class MainWindow(QMainWindow):
         self.monster_search = QLineEdit()
         self.monster_search.setPlaceholderText("Search Monsters...")
         self.monster_search.textChanged.connect(lambda t: self.filter_items(t, "monster"))
+        self.search_timers["monster"] = self.create_search_timer("monster")
 
-        self.monster_list = QListWidget()
-        self.monster_list.itemClicked.connect(self.display_items)
+        self.monster_list = self.create_list_view("monster")
 
         monster_layout.addWidget(self.monster_search)
         monster_layout.addWidget(self.monster_list)
@@ -127,9 +420,9 @@ class MainWindow(QMainWindow):
         self.item_search = QLineEdit()
         self.item_search.setPlaceholderText("Search Items...")
         self.item_search.textChanged.connect(lambda t: self.filter_items(t, "item"))
+        self.search_timers["item"] = self.create_search_timer("item")
 
-        self.item_list = QListWidget()
-        self.item_list.itemClicked.connect(self.display_items)
+        self.item_list = self.create_list_view("item")
 
         item_layout.addWidget(self.item_search)
         item_layout.addWidget(self.item_list)
@@ -137,42 +430,126 @@ class MainWindow(QMainWindow):
 
         return panel
 
-    def fetch_all_data(self):
-        # Fetch monsters
-        self.monster_worker = DataWorker("monsters")
-        self.monster_worker.data_signal.connect(lambda data: self.on_data_loaded(data, "monster"))
-        self.monster_worker.error_signal.connect(self.on_api_error)
-        self.monster_worker.start()
-
-        # Fetch items
-        self.item_worker = DataWorker("items")
-        self.item_worker.data_signal.connect(lambda data: self.on_data_loaded(data, "item"))
-        self.item_worker.error_signal.connect(self.on_api_error)
-        self.item_worker.start()
-
-    def on_data_loaded(self, data_list, category_type):
-        target_list = self.monster_list if category_type == "monster" else self.item_list
-        target_list.clear()
-
-        for item in data_list:
-            item["category"] = category_type
-            name = item.get("name")
-            self.all_data[name] = item
-            target_list.addItem(name)
+    def send_request(self, endpoint, on_data, method="GET", data=None, key=None, headers=None):
+        request = self.api.request(endpoint, method=method, data=data, key=key, headers=headers)
+        request.data_signal.connect(on_data)
+        request.error_signal.connect(self.on_api_error)
+        return request
+
+    def create_list_view(self, category):
+        view = QListView()
+        view.setUniformItemSizes(True)
+        view.setModel(self.models[category])
+        view.clicked.connect(lambda index: self.display_items(index, category))
+        return view
+
+    def search_box(self, category):
+        return self.monster_search if category == "monster" else self.item_search
+
+    # Start from the saved copy and download only the changes since its version,
+    # a category without one (or one the server can no longer replay) is loaded from the first page
+    def sync_all(self):
+        state = load_sync_state()
+        for category in CATEGORIES:
+            saved = state.get(category)
+            if not saved or not isinstance(saved.get("entries"), list):
+                self.full_sync(category)
+                continue
+            self.models[category].load(
+                [tuple(entry) for entry in saved["entries"]], saved.get("next"), saved.get("complete", False)
+            )
+            self.sync_versions[category] = saved["version"]
+            self.fetch_changes(category)
+
+    def full_sync(self, category):
+        self.sync_versions.pop(category, None)
+        # The version is read before the pages, changes made meanwhile are replayed by the next sync
+        self.send_request(
+            f"changes?collection={category}s&limit=0", lambda result: self.on_full_sync_started(result, category)
+        )
+
+    def on_full_sync_started(self, result, category):
+        self.pending_versions[category] = result["latest"]
+        model = self.models[category]
+        model.load([])
+        # An attached view may already have asked for the first page during the reset
+        if model.canFetchMore():
+            model.fetchMore()
+
+    def fetch_changes(self, category):
+        endpoint = f"changes?collection={category}s&since={self.sync_versions[category]}"
+        self.send_request(endpoint, lambda result: self.on_changes_loaded(result, category))
+
+    def on_changes_loaded(self, result, category):
+        if result["reset"] or any(change["op"] == "reset" for change in result["changes"]):
+            self.full_sync(category)
+            return
+
+        for change in result["changes"]:
+            self.apply_change(category, change["op"], change["id"], change.get("fields"))
+        self.sync_versions[category] = result["version"]
+        if result["more"]:
+            self.fetch_changes(category)
+
+    # Applies one write to the list and the detail cache without reloading anything
+    def apply_change(self, category, op, entry_id, fields=None):
+        self.models[category].apply_change(op, entry_id, fields)
+        self.detail_cache.pop((category, entry_id), None)
+        if category == "item":
+            # Monster details embed their held item
+            for key in [key for key in self.detail_cache if key[0] == "monster"]:
+                del self.detail_cache[key]
+
+    # Called by the list model when its view needs the next page
+    def fetch_page(self, category_type, cursor=None):
+        # Lists only need names, the full document is fetched when an entry is selected
+        params = ["fields=name", f"limit={LIST_PAGE_SIZE}"]
+        if cursor is not None:
+            params.append(f"cursor={cursor}")
+        endpoint = f"{category_type}s?{'&'.join(params)}"
+        request = self.send_request(
+            endpoint, lambda page: self.on_data_loaded(page, category_type), key=f"page:{category_type}"
+        )
+        request.error_signal.connect(lambda _: setattr(self.models[category_type], "loading", False))
+
+    def on_data_loaded(self, page, category_type):
+        self.models[category_type].append_page(page.get("data", []), page.get("next"))
+        # The version read before the first page covers the entries loaded from it onwards
+        if category_type in self.pending_versions:
+            self.sync_versions[category_type] = self.pending_versions.pop(category_type)
 
     def on_api_error(self, message):
         QMessageBox.critical(self, "API Error", f"Request failed: {message}")
 
     # Display currently selected item on right panel - main screen
-    def display_items(self, current):
-        if not current:
+    def display_items(self, current, category):
+        if not current.isValid():
             return
-        name = current.text()
-        data = self.all_data.get(name)
+        entry_id = current.data(Qt.ItemDataRole.UserRole)
 
-        if not data:
+        cached = self.detail_cache.get((category, entry_id))
+        if cached is not None:
+            self.detail_cache.move_to_end((category, entry_id))
+            self.api.cancel("detail")
+            self.on_detail_loaded(dict(cached), category)
             return
 
+        if category == "monster":
+            endpoint = f"monsters/{entry_id}?expand=held_item"
+        else:
+            endpoint = f"items/{entry_id}"
+
+        # Only the latest selection is rendered
+        self.send_request(endpoint, lambda data: self.on_detail_loaded(data, category, cache=True), key="detail")
+
+    def on_detail_loaded(self, data, category, cache=False):
+        if cache:
+            self.detail_cache[(category, data["_id"])] = dict(data)
+            if len(self.detail_cache) > DETAIL_CACHE_SIZE:
+                self.detail_cache.popitem(last=False)
+        data["category"] = category
+        name = data.get("name")
+
         self.clear_layout(self.right_layout)
 
         item_category = data.get("category", "unknown")
@@ -199,14 +576,10 @@ class MainWindow(QMainWindow):
             display_name = self.display_labels.get(key, key.title())
             combat_layout.addRow(QLabel(f"{display_name}: "), QLabel(val))
 
-        held_id = data.get("held_item_id")
+        # The held item comes embedded by the backend (?expand=held_item)
         item_name = "None"
-
-        if held_id:
-            for item in self.all_data.values():
-                if item.get("category") == "item" and str(item.get("_id")) == str(held_id):
-                    item_name = item.get("name", "Unknown Item")
-                    break
+        if data.get("held_item_id"):
+            item_name = (data.get("held_item") or {}).get("name", "Unknown Item")
 
         combat_layout.addRow(QLabel("Equipped Item:"), QLabel(f"<b>{item_name}</b>"))
 
@@ -331,40 +704,50 @@ class MainWindow(QMainWindow):
             QPushButton:hover { background-color: #c82333; }
         """)
         entity_id = data.get("_id")
-        btn_delete.clicked.connect(lambda: self.delete_entity("item", entity_id, name))
+        btn_delete.clicked.connect(lambda: self.delete_entity("items", entity_id, name))
 
         btn_layout.addWidget(btn_edit)
         btn_layout.addWidget(btn_delete)
 
         self.right_layout.addLayout(btn_layout)
 
+    def create_search_timer(self, category):
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(SEARCH_DEBOUNCE_MS)
+        timer.timeout.connect(lambda: self.run_search(category))
+        return timer
+
+    # Names already loaded are filtered by prefix right away, the server search runs once typing pauses
     def filter_items(self, text, category):
-        if not text.strip():
-            endpoint = f"{category}s"
-            self.refresh_worker = DataWorker(endpoint)
-            self.refresh_worker.data_signal.connect(lambda data: self.on_data_loaded(data, category))
-            self.refresh_worker.error_signal.connect(self.on_api_error)
-            self.refresh_worker.start()
+        self.search_seq[category] += 1
+        needle = text.strip().casefold()
+        if not needle:
+            self.search_timers[category].stop()
+            self.api.cancel(f"search:{category}")
+            self.models[category].set_filter(None)
             return
 
-        endpoint = f"search/{category}s?query={text}"
+        self.models[category].set_filter([
+            (entry_id, name) for entry_id, name in self.models[category].loaded_entries()
+            if name.casefold().startswith(needle)
+        ])
+        self.search_timers[category].start()
 
-        self.search_worker = DataWorker(endpoint)
-
-        self.search_worker.data_signal.connect(lambda data: self.on_search_results(data, category))
-        self.search_worker.error_signal.connect(self.on_api_error)
-        self.search_worker.start()
-
-    def on_search_results(self, results, category):
-        target_list = self.monster_list if category == "monster" else self.item_list
-        target_list.clear()
-
-        for item in results:
-            item["category"] = category
-            name = item.get("name")
+    def run_search(self, category):
+        text = self.search_box(category).text().strip()
+        if not text:
+            return
+        seq = self.search_seq[category]
+        endpoint = f"search/{category}s?query={quote(text)}&fields=name&mode=fuzzy"
+        self.send_request(
+            endpoint, lambda data: self.on_search_results(data, category, seq), key=f"search:{category}"
+        )
 
-            self.all_data[name] = item
-            target_list.addItem(name)
+    def on_search_results(self, results, category, seq):
+        if seq != self.search_seq[category]:
+            return
+        self.models[category].set_filter([(item["_id"], item.get("name", "")) for item in results])
 
     def clear_layout(self, layout):
         while layout.count():
@@ -396,9 +779,8 @@ class MainWindow(QMainWindow):
 
         self.form_inputs["held_item_id"] = QComboBox()
         self.form_inputs["held_item_id"].addItem("None", None)
-        for name, item_data in self.all_data.items():
-            if item_data.get("category") == "item":
-                self.form_inputs["held_item_id"].addItem(name, item_data.get("_id"))
+        for item_id, item_name in self.models["item"].loaded_entries():
+            self.form_inputs["held_item_id"].addItem(item_name, item_id)
         form_basic.addRow("Equipped Item:", self.form_inputs["held_item_id"])
 
         group_basic.setLayout(form_basic)
@@ -591,17 +973,17 @@ class MainWindow(QMainWindow):
 
     # Save to endpoint
     def save_data(self, endpoint, data_to_save):
-        self.save_worker = DataWorker(endpoint, method="POST", data=data_to_save)
-
-        self.save_worker.data_signal.connect(self.on_save_success)
-        self.save_worker.error_signal.connect(self.on_api_error)
-        self.save_worker.start()
+        category = endpoint[:-1]
+        self.send_request(
+            endpoint, lambda response_data: self.on_save_success(response_data, category),
+            method="POST", data=data_to_save
+        )
 
-    def on_save_success(self, response_data):
+    # The API answers writes with the stored record, which is applied to the list as is
+    def on_save_success(self, response_data, category):
         QMessageBox.information(self, "Success", "Data saved successfully!")
 
-        self.all_data.clear()
-        self.fetch_all_data()
+        self.apply_change(category, "insert", response_data["_id"], response_data)
 
         self.clear_layout(self.right_layout)
 
@@ -632,13 +1014,16 @@ class MainWindow(QMainWindow):
         self.form_inputs["held_item_id"].addItem("None", None)
 
         current_held_id = data.get("held_item_id")
-        for name, item_data in self.all_data.items():
-            if item_data.get("category") == "item":
-                item_id = item_data.get("_id")
-                self.form_inputs["held_item_id"].addItem(name, item_id)
+        held_item = data.get("held_item")
+        options = self.models["item"].loaded_entries()
+        # The list may not have reached the held item yet
+        if held_item and self.models["item"].name_of(held_item["_id"]) is None:
+            options.append((held_item["_id"], held_item.get("name", "")))
+        for item_id, item_name in options:
+            self.form_inputs["held_item_id"].addItem(item_name, item_id)
 
-                if str(item_id) == str(current_held_id):
-                    self.form_inputs["held_item_id"].setCurrentIndex(self.form_inputs["held_item_id"].count() - 1)
+            if str(item_id) == str(current_held_id):
+                self.form_inputs["held_item_id"].setCurrentIndex(self.form_inputs["held_item_id"].count() - 1)
 
         form_basic.addRow("Equipped Item:", self.form_inputs["held_item_id"])
         group_basic.setLayout(form_basic)
@@ -708,7 +1093,7 @@ class MainWindow(QMainWindow):
             }
         """)
 
-        btn_save.clicked.connect(lambda: self.update_entity("monsters", entity_id))
+        btn_save.clicked.connect(lambda: self.update_entity("monsters", entity_id, data))
         self.right_layout.addWidget(btn_save)
 
     def edit_item(self, data):
@@ -772,10 +1157,11 @@ class MainWindow(QMainWindow):
             }
         """)
 
-        btn_save.clicked.connect(lambda: self.update_entity("items", entity_id))
+        btn_save.clicked.connect(lambda: self.update_entity("items", entity_id, data))
         self.right_layout.addWidget(btn_save)
 
-    def update_entity(self, endpoint_base, entity_id):
+    # Only the fields that differ from the loaded document are sent, guarded by the version it was loaded at
+    def update_entity(self, endpoint_base, entity_id, original):
         data = {}
         for key, widget in self.form_inputs.items():
             if isinstance(widget, QLineEdit):
@@ -804,17 +1190,24 @@ class MainWindow(QMainWindow):
             error_msg = "The following fields are required:\n\n" + "\n".join(missing_fields)
             QMessageBox.warning(self, "Validation Error", error_msg)
             return
+
+        changes = {key: value for key, value in data.items() if value != original.get(key)}
+        if not changes:
+            QMessageBox.information(self, "No Changes", "Nothing was changed.")
+            return
         full_path = f"{endpoint_base}/{entity_id}"
 
-        self.edit_worker = DataWorker(full_path, method="PUT", data=data)
-        self.edit_worker.data_signal.connect(self.on_edit_success)
-        self.edit_worker.error_signal.connect(self.on_api_error)
-        self.edit_worker.start()
+        category = endpoint_base[:-1]
+        request = self.send_request(
+            full_path, lambda response_data: self.on_edit_success(response_data, category), method="PATCH",
+            data=changes, headers={"If-Match": f'"{original.get("version", 0)}"'}
+        )
+        # A rejected edit usually means the copy is stale, the next selection loads it again
+        request.error_signal.connect(lambda _: self.detail_cache.pop((category, entity_id), None))
 
-    def on_edit_success(self, response_data):
+    def on_edit_success(self, response_data, category):
         QMessageBox.information(self, "Success", "Updated successfully!")
-        self.all_data.clear()
-        self.fetch_all_data()
+        self.apply_change(category, "update", response_data["_id"], response_data)
         self.clear_layout(self.right_layout)
 
     def delete_entity(self, endpoint, entity_id, name):
@@ -832,16 +1225,15 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             full_path = f"{endpoint}/{entity_id}"
 
-            self.del_worker = DataWorker(full_path, method="DELETE")
-            self.del_worker.data_signal.connect(lambda: self.on_delete_success(name))
-            self.del_worker.error_signal.connect(self.on_api_error)
-            self.del_worker.start()
+            category = endpoint[:-1]
+            self.send_request(
+                full_path, lambda _: self.on_delete_success(name, category, entity_id), method="DELETE"
+            )
 
-    def on_delete_success(self, name):
+    def on_delete_success(self, name, category, entity_id):
         QMessageBox.information(self, "Success", f"Successfully deleted: {name}")
 
-        self.all_data.clear()
-        self.fetch_all_data()
+        self.apply_change(category, "delete", entity_id)
 
         self.clear_layout(self.right_layout)
 